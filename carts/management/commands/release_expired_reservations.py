@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# Local imports goes here!
+from carts.utils import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Give the stock held by expired cart lines back to their products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep running, sweeping every --interval seconds.",
+        )
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            stats = release_expired_reservations(batch_size=options["batch_size"])
+            self.stdout.write(
+                f"released_lines={stats['lines']} released_units={stats['units']} "
+                f"products={stats['products']} batches={stats['batches']} elapsed={stats['elapsed']}s"
+            )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -15,7 +15,17 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    # The line's quantity is held off Product.stock until then; see release_expired_reservations.
+    reserved_until = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            # One line per product and cart; lets add-to-cart upsert the line.
+            models.UniqueConstraint(fields=['cart', 'product'], name='cartitem_unique_cart_product'),
+        ]
+        indexes = [
+            models.Index(fields=['reserved_until'], name='cartitem_reserved_until_idx'),
+        ]
 
     def total_price(self):
         return self.product.price * self.quantity
@@ -1,7 +1,6 @@
 from rest_framework import serializers
 # Local Import goes here!
 from .models import Cart, CartItem
-from .models import Cart, CartItem
 from products.serializers import ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -23,3 +22,17 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ['id', 'user', 'created_at', 'items']
 
+
+class CartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    add = CartLineSerializer(many=True, required=False, default=list)
+    remove = CartLineSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        if not attrs["add"] and not attrs["remove"]:
+            raise serializers.ValidationError("Provide at least one line to add or remove.")
+        return attrs
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import CartDetailView, CartItemAddView, CartItemRemoveView 
+from .views import CartDetailView, CartItemAddView, CartItemRemoveView, CartBatchView
 
 app_name = 'carts'
 
@@ -7,5 +7,6 @@ urlpatterns = [
     path('', CartDetailView.as_view(), name='cart-detail'),
     path('add/<int:product_id>/', CartItemAddView.as_view(), name='cart-item-add'),
     path('remove/<int:product_id>/', CartItemRemoveView.as_view(), name='cart-item-remove'),
+    path('batch/', CartBatchView.as_view(), name='cart-batch'),
 
 ]
@@ -0,0 +1,157 @@
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Local imports goes here!
+from .models import CartItem
+from products.cache import invalidate_products
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def reserve_stock(product_id, quantity):
+    """
+        Take `quantity` off the product's stock in one conditional UPDATE.
+        Returns False when the product is missing or has too little stock left;
+        concurrent reservations can never drive the stock below zero.
+    """
+    return bool(
+        Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+            stock=F("stock") - quantity, updated_at=timezone.now()
+        )
+    )
+
+
+def release_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(
+        stock=F("stock") + quantity, updated_at=timezone.now()
+    )
+
+
+class StockConflict(Exception):
+    """ A batch stock or cart update touched fewer rows than it had lines. """
+
+
+def _execute_lines(sql, params, expected):
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+        if cursor.rowcount != expected:
+            raise StockConflict()
+
+
+def reserve_stock_lines(lines):
+    """
+        reserve_stock() for many products as one prepared statement run through
+        executemany(). `lines` maps product id to quantity. Raises StockConflict if any
+        product lacks the stock; call it inside a transaction so that rolls back the rest.
+    """
+    table = connection.ops.quote_name(Product._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = f"UPDATE {table} SET stock = stock - %s, updated_at = %s WHERE id = %s AND stock >= %s"
+    params = [(quantity, now, product_id, quantity) for product_id, quantity in lines.items()]
+    _execute_lines(sql, params, len(params))
+
+
+def release_stock_lines(lines):
+    table = connection.ops.quote_name(Product._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = f"UPDATE {table} SET stock = stock + %s, updated_at = %s WHERE id = %s"
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(quantity, now, product_id) for product_id, quantity in lines.items()])
+
+
+def remove_cart_item_lines(cart, lines):
+    """
+        Take quantities off existing cart lines and drop the lines that reach zero.
+        Raises StockConflict if a line is missing or holds less than asked.
+    """
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET quantity = quantity - %s "
+        f"WHERE cart_id = %s AND product_id = %s AND quantity >= %s"
+    )
+    params = [(quantity, cart.id, product_id, quantity) for product_id, quantity in lines.items()]
+    _execute_lines(sql, params, len(params))
+    CartItem.objects.filter(cart=cart, product_id__in=list(lines), quantity=0).delete()
+
+
+def upsert_cart_items(cart, lines):
+    """
+        Add quantities to cart lines with INSERT ... ON CONFLICT DO UPDATE, creating the
+        lines that don't exist yet. `lines` is an iterable of (product_id, quantity).
+    """
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (cart_id, product_id, quantity, reserved_until) VALUES (%s, %s, %s, %s) "
+        f"ON CONFLICT (cart_id, product_id) DO UPDATE SET "
+        f"quantity = {table}.quantity + excluded.quantity, reserved_until = excluded.reserved_until"
+    )
+    # Every addition renews the reservation of the whole line.
+    reserved_until = connection.ops.adapt_datetimefield_value(
+        timezone.now() + settings.CART_RESERVATION_TTL
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql, [(cart.id, product_id, quantity, reserved_until) for product_id, quantity in lines]
+        )
+
+
+def invalidate_reserved_products(product_ids):
+    """ Stock moved through queryset.update(); drop the cached product pages after commit. """
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+
+
+def release_expired_reservations(batch_size=1000, now=None):
+    """
+        Delete cart lines whose reservation ran out and give their quantities back to stock.
+
+        Lines are taken oldest first in batches straight off the reserved_until index, each
+        batch in its own short transaction; stock is returned with one grouped UPDATE per
+        batch. Rows locked by another worker are skipped where the database supports it.
+        Returns counters describing what was released.
+    """
+    now = now or timezone.now()
+    started = time.monotonic()
+    stats = {"batches": 0, "lines": 0, "units": 0, "products": 0}
+    released_products = set()
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                CartItem.objects.select_for_update(skip_locked=True)
+                .filter(reserved_until__lte=now)
+                .order_by("reserved_until")
+                .values_list("id", "product_id", "quantity")[:batch_size]
+            )
+            if not batch:
+                break
+
+            CartItem.objects.filter(id__in=[line_id for line_id, _, _ in batch]).delete()
+            quantities = defaultdict(int)
+            for _, product_id, quantity in batch:
+                quantities[product_id] += quantity
+            release_stock_lines(quantities)
+            invalidate_reserved_products(quantities)
+
+        stats["batches"] += 1
+        stats["lines"] += len(batch)
+        stats["units"] += sum(quantities.values())
+        released_products.update(quantities)
+        if len(batch) < batch_size:
+            break
+
+    stats["products"] = len(released_products)
+    stats["elapsed"] = round(time.monotonic() - started, 3)
+    if stats["lines"]:
+        logger.info(
+            f"Released {stats['units']} units from {stats['lines']} expired cart lines "
+            f"across {stats['products']} products in {stats['batches']} batches ({stats['elapsed']}s)"
+        )
+    return stats
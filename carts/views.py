@@ -1,11 +1,25 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
 import logging
 # Local Import goes here!
 from .models import Cart, CartItem
 from products.models import Product
-from .serializers import CartSerializer, CartItemSerializer
+from order_processing_system.async_views import AsyncAPIView
+from .serializers import CartSerializer, CartItemSerializer, CartBatchSerializer
+from .utils import (
+    StockConflict,
+    invalidate_reserved_products,
+    release_stock,
+    release_stock_lines,
+    remove_cart_item_lines,
+    reserve_stock,
+    reserve_stock_lines,
+    upsert_cart_items,
+)
 
 from dotenv import load_dotenv
 logger = logging.getLogger(__name__)
@@ -15,10 +29,17 @@ load_dotenv()
 
 
 
-class CartDetailView(APIView):
-    def get(self, request):
+# The cart's lines with their products, so serializing a cart runs no further queries.
+CART_ITEMS = Prefetch('items', queryset=CartItem.objects.select_related('product'))
+
+
+class CartDetailView(AsyncAPIView):
+    async def get(self, request):
         try:
-            cart, created = Cart.objects.get_or_create(user=request.user)
+            cart, created = await Cart.objects.prefetch_related(CART_ITEMS).aget_or_create(user=request.user)
+            if created:
+                # get_or_create() only prefetches on the get path.
+                await sync_to_async(prefetch_related_objects)([cart], CART_ITEMS)
             serializer = CartSerializer(cart)
             return Response(serializer.data)
         except Exception as e:
@@ -26,38 +47,41 @@ class CartDetailView(APIView):
             return Response({'error': 'An error occurred while retrieving the cart.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         
+def get_quantity(request):
+    """ Requested quantity, 1 when not given; None when it is not a positive integer. """
+    try:
+        quantity = int(request.data.get('quantity', 1))
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity > 0 else None
+
+
 class CartItemAddView(APIView):
     def post(self, request, product_id):
         try:
+            quantity = get_quantity(request)
+            if quantity is None:
+                return Response({"error": "Quantity must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
             cart, created = Cart.objects.get_or_create(user=request.user)
-            try:
-                product = Product.objects.get(pk=product_id)
-            except Product.DoesNotExist:
-                logger.error('Attempted to add non-existent product to cart')
-                return Response({"error": "The product does not exist."}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Check if the product is in stock
-            if product.stock > 0:
-                quantity = int(request.data.get('quantity', 1))  # Default to 1 if quantity is not specified
-                if quantity <= product.stock:
-                    # Check if the product is already in the cart
-                    if CartItem.objects.filter(cart=cart, product=product).exists():
-                        cart_item = CartItem.objects.get(cart=cart, product=product)
-                        cart_item.quantity += quantity
-                        cart_item.save()
-                    else:
-                        cart_item = CartItem.objects.create(cart=cart, product=product, quantity=quantity)
-                    
-                    # Deduct the quantity from the product's stock
-                    product.stock -= quantity
-                    product.save()
-
-                    serializer = CartItemSerializer(cart_item)
-                    return Response(serializer.data, status=status.HTTP_201_CREATED)
-                else:
+            with transaction.atomic():
+                # Stock check and deduction are a single conditional UPDATE, so two
+                # concurrent requests can't both take the last unit.
+                if not reserve_stock(product_id, quantity):
+                    stock = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first()
+                    if stock is None:
+                        logger.error('Attempted to add non-existent product to cart')
+                        return Response({"error": "The product does not exist."}, status=status.HTTP_404_NOT_FOUND)
+                    if stock == 0:
+                        return Response({"error": "The product is out of stock."}, status=status.HTTP_400_BAD_REQUEST)
                     return Response({"error": "Insufficient stock for the requested quantity."}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({"error": "The product is out of stock."}, status=status.HTTP_400_BAD_REQUEST)
+
+                upsert_cart_items(cart, [(product_id, quantity)])
+                invalidate_reserved_products([product_id])
+
+            cart_item = CartItem.objects.select_related('product').get(cart=cart, product_id=product_id)
+            serializer = CartItemSerializer(cart_item)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
             logger.error(f'Error occurred while adding item to cart: {str(e)}')
             return Response({'error': 'An error occurred while adding item to cart.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -66,35 +90,115 @@ class CartItemAddView(APIView):
 class CartItemRemoveView(APIView):
     def post(self, request, product_id):
         try:
+            quantity = get_quantity(request)
+            if quantity is None:
+                return Response({"error": "Quantity must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
             cart, created = Cart.objects.get_or_create(user=request.user)
-            try:
-                product = Product.objects.get(pk=product_id)
-            except Product.DoesNotExist:
-                logger.error('Attempted to remove non-existent product from cart')
-                return Response({"error": "The product does not exist."}, status=status.HTTP_404_NOT_FOUND)
-
-            # Check if the product is in the cart
-            if CartItem.objects.filter(cart=cart, product=product).exists():
-                cart_item = CartItem.objects.get(cart=cart, product=product)
-                quantity = int(request.data.get('quantity', 1))  # Default to 1 if quantity is not specified
-                if quantity <= cart_item.quantity:  # Ensure that the requested quantity does not exceed the quantity in the cart
-                    cart_item.quantity -= quantity
-                    cart_item.save()
-
-                    # Remove the item from the cart if the quantity becomes zero
-                    if cart_item.quantity == 0:
-                        cart_item.delete()
-
-                    # Add the quantity back to the product's stock
-                    product.stock += quantity
-                    product.save()
-
-                    return Response({"message": f"{quantity} units of the product have been removed from the cart."}, status=status.HTTP_204_NO_CONTENT)
-                else:
-                    return Response({"error": "The requested quantity exceeds the quantity in the cart."}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({"error": "The product is not in the cart."}, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                # Ensure that the requested quantity does not exceed the quantity in the cart
+                removed = CartItem.objects.filter(
+                    cart=cart, product_id=product_id, quantity__gte=quantity
+                ).update(quantity=F('quantity') - quantity)
+
+                if not removed:
+                    if not Product.objects.filter(pk=product_id).exists():
+                        logger.error('Attempted to remove non-existent product from cart')
+                        return Response({"error": "The product does not exist."}, status=status.HTTP_404_NOT_FOUND)
+                    if CartItem.objects.filter(cart=cart, product_id=product_id).exists():
+                        return Response({"error": "The requested quantity exceeds the quantity in the cart."}, status=status.HTTP_400_BAD_REQUEST)
+                    return Response({"error": "The product is not in the cart."}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Remove the item from the cart if the quantity becomes zero
+                CartItem.objects.filter(cart=cart, product_id=product_id, quantity=0).delete()
+
+                # Add the quantity back to the product's stock
+                release_stock(product_id, quantity)
+                invalidate_reserved_products([product_id])
+
+            return Response({"message": f"{quantity} units of the product have been removed from the cart."}, status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             logger.error(f'Error occurred while removing item from cart: {str(e)}')
             return Response({'error': 'An error occurred while removing item from cart.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
\ No newline at end of file
+
+
+def merge_lines(lines):
+    """ [{product_id, quantity}, ...] -> {product_id: total quantity} """
+    merged = {}
+    for line in lines:
+        merged[line['product_id']] = merged.get(line['product_id'], 0) + line['quantity']
+    return merged
+
+
+def batch_conflict(cart, step, to_add, to_remove):
+    """
+        The error body for a batch that failed at `step`. Call it once the batch transaction
+        has rolled back, so the cart and stock read here are those the batch started from.
+    """
+    if step == 'remove':
+        in_cart = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=list(to_remove))
+            .values_list('product_id', 'quantity')
+        )
+        return {
+            "error": "The requested quantity exceeds the quantity in the cart.",
+            "product_ids": sorted(
+                product_id for product_id, quantity in to_remove.items()
+                if in_cart.get(product_id, 0) < quantity
+            ),
+        }
+
+    stock = dict(Product.objects.filter(pk__in=list(to_add)).values_list('id', 'stock'))
+    return {
+        "error": "Insufficient stock for the requested quantity.",
+        # The batch's removals give their stock back before the additions take theirs.
+        "product_ids": sorted(
+            product_id for product_id, quantity in to_add.items()
+            if stock.get(product_id, 0) + to_remove.get(product_id, 0) < quantity
+        ),
+    }
+
+
+class CartBatchView(APIView):
+    """ Add and remove many cart lines in one request and one transaction """
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        to_add = merge_lines(serializer.validated_data['add'])
+        to_remove = merge_lines(serializer.validated_data['remove'])
+
+        try:
+            product_ids = set(to_add) | set(to_remove)
+            found = set(Product.objects.filter(pk__in=product_ids).values_list('id', flat=True))
+            missing = sorted(product_ids - found)
+            if missing:
+                logger.error(f'Attempted to change non-existent products in cart: {missing}')
+                return Response({"error": "Some products do not exist.", "product_ids": missing}, status=status.HTTP_404_NOT_FOUND)
+
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            step = None
+            try:
+                with transaction.atomic():
+                    # Removals first so a request can swap quantities between lines.
+                    if to_remove:
+                        step = 'remove'
+                        remove_cart_item_lines(cart, to_remove)
+                        release_stock_lines(to_remove)
+
+                    if to_add:
+                        step = 'add'
+                        reserve_stock_lines(to_add)
+                        upsert_cart_items(cart, to_add.items())
+
+                    invalidate_reserved_products(product_ids)
+            except StockConflict:
+                # Nothing was applied: the transaction rolled back every line.
+                return Response(batch_conflict(cart, step, to_add, to_remove), status=status.HTTP_400_BAD_REQUEST)
+
+            cart = Cart.objects.prefetch_related(CART_ITEMS).get(pk=cart.pk)
+            return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f'Error occurred while updating cart: {str(e)}')
+            return Response({'error': 'An error occurred while updating the cart.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -6,5 +6,10 @@ python manage.py migrate
 # Create new migration files
 python manage.py makemigrations
 
-# Start the Django development server
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+if [ "$SERVER_MODE" = "production" ]; then
+    # Gunicorn managing Uvicorn (ASGI) workers, one per CPU core by default (gunicorn.conf.py)
+    exec gunicorn order_processing_system.asgi:application -c gunicorn.conf.py
+else
+    # Start the Django development server
+    python manage.py runserver 0.0.0.0:8000
+fi
@@ -0,0 +1,30 @@
+# Gunicorn settings for the production ASGI mode (see entrypoint.sh):
+#   gunicorn order_processing_system.asgi:application -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# Settings pick their multi-process defaults (e.g. the shared cache) from this, also when
+# gunicorn is started by hand rather than through entrypoint.sh.
+os.environ.setdefault("SERVER_MODE", "production")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Each Uvicorn worker is one process running an event loop, so a worker holds thousands
+# of idle keep-alive connections without a thread each. One worker per core keeps every
+# core busy; WEB_CONCURRENCY overrides it.
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Seconds an idle keep-alive connection is kept open.
+keepalive = int(os.getenv("KEEPALIVE", 75))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+
+# Recycle workers now and then so a slow leak can't grow without bound.
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+
+# Trust X-Forwarded-* only from these proxy addresses.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+accesslog = os.getenv("ACCESS_LOG", "-")
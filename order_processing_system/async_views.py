@@ -0,0 +1,37 @@
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+        APIView whose handlers may be coroutines (DRF 3.14 only dispatches sync handlers).
+
+        An async handler runs on the event loop: authentication, permission and throttle
+        checks go through sync_to_async first, then the handler is awaited, so it should
+        read the database with the async ORM. Sync handlers on the same view (e.g. the
+        admin-only writes) keep their usual DRF dispatch, run in a worker thread.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if not iscoroutinefunction(handler):
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
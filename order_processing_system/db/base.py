@@ -0,0 +1,51 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "EXCLUSIVE", "IMMEDIATE")
+
+
+def run_init_command(conn, init_command):
+    """ Run each ';'-separated statement of `init_command` (typically PRAGMAs) on `conn`. """
+    for statement in (init_command or "").split(";"):
+        statement = statement.strip()
+        if statement:
+            conn.execute(statement)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+        Django's SQLite backend with the `init_command` and `transaction_mode` OPTIONS that
+        Django 5.1 adds to it: `init_command` runs on every new connection, and atomic
+        blocks start with BEGIN <transaction_mode>. With IMMEDIATE a writer takes the write
+        lock when its transaction starts, so it waits out busy_timeout behind another writer
+        instead of failing with "database is locked" when its read lock can't be upgraded.
+    """
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = self.settings_dict["OPTIONS"]
+        self.init_command = options.get("init_command")
+        transaction_mode = options.get("transaction_mode")
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES OPTIONS transaction_mode must be one of {', '.join(TRANSACTION_MODES)}."
+            )
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Ours, not sqlite3.connect() arguments.
+        kwargs.pop("init_command", None)
+        kwargs.pop("transaction_mode", None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        run_init_command(conn, self.init_command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
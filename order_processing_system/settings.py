@@ -2,6 +2,7 @@
 from pathlib import Path
 import datetime
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -52,10 +53,38 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'order_processing_system.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', 20)),
+    'DEFAULT_THROTTLE_CLASSES': [
+        'order_processing_system.throttling.TokenBucketThrottle',
+    ],
+}
+
+# Token-bucket rate limits per endpoint scope: `rate` is the refill rate, `burst` the bucket
+# size, `per` whether requests are counted per signed-in user or per client IP. The buckets
+# live in a small SQLite file shared by every worker process on the host; keep it on tmpfs.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_DB = os.getenv(
+    'RATE_LIMIT_DB',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'ops-rate-limits.sqlite3'),
+)
+RATE_LIMITS = {
+    'login': {'rate': os.getenv('RATE_LIMIT_LOGIN', '10/min'), 'burst': 5, 'per': 'ip'},
+    'signup': {'rate': os.getenv('RATE_LIMIT_SIGNUP', '5/hour'), 'burst': 5, 'per': 'ip'},
+    'checkout': {'rate': os.getenv('RATE_LIMIT_CHECKOUT', '30/min'), 'burst': 10, 'per': 'user'},
+    'payment': {'rate': os.getenv('RATE_LIMIT_PAYMENT', '10/min'), 'burst': 5, 'per': 'user'},
 }
 
+# Users resolved from access tokens are kept in memory per process: at most
+# AUTH_USER_CACHE_SIZE users, each for AUTH_USER_CACHE_TTL seconds (0 disables the cache).
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+
+# Hard upper bound for the ?page_size= query parameter on paginated endpoints.
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 100))
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -92,14 +121,132 @@ WSGI_APPLICATION = 'order_processing_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLITE_TUNING (on by default) applies a production profile to every connection: WAL so
+# readers don't wait for the writer, busy_timeout so writers queue instead of failing,
+# synchronous=NORMAL (safe with WAL), a memory-mapped file and a larger page cache. Atomic
+# blocks start with BEGIN IMMEDIATE (see order_processing_system.db). Measure it with
+# `python manage.py benchmark_sqlite`.
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'True') == 'True'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Negative: KiB rather than pages, per connection.
+    'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', 32 * 1024)),
+    'temp_store': 'MEMORY',
+}
+SQLITE_TUNED_OPTIONS = {
+    'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'order_processing_system.db' if SQLITE_TUNING else 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_TUNED_OPTIONS if SQLITE_TUNING else {},
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; set CACHE_LOCATION to a directory to share entries between
+# worker processes through the file based backend instead. Gunicorn runs several worker
+# processes (SERVER_MODE=production), so there the shared directory is the default: with
+# a cache per process, invalidating a product in one worker would leave the others stale.
+
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+if not CACHE_LOCATION and os.getenv('SERVER_MODE') == 'production':
+    CACHE_LOCATION = '/tmp/order-processing-system-cache'
+
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'order-processing-system',
+        }
+    }
+
+# Seconds a cached product representation or catalog page is kept.
+PRODUCT_CACHE_TIMEOUT = int(os.getenv('PRODUCT_CACHE_TIMEOUT', 300))
+
+
+# Stock taken by a cart line is given back this long after the line was last added to,
+# by `manage.py release_expired_reservations`.
+CART_RESERVATION_TTL = datetime.timedelta(minutes=int(os.getenv('CART_RESERVATION_TTL_MINUTES', 30)))
+
+
+# Idempotency-Key support on order creation and payment: how long a stored response is
+# replayed, after how long an unfinished request may be taken over by a retry, and how
+# long a concurrent retry waits for the first request to finish.
+IDEMPOTENCY_KEY_TTL = datetime.timedelta(hours=int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+IDEMPOTENCY_LOCK_TIMEOUT = datetime.timedelta(seconds=60)
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+
+
+# Payments: 'stripe' or 'simulator' (an in-process stand-in with configurable latency and
+# decline rate). With PAYMENT_ASYNC the payment endpoint answers 202 and the charge runs on
+# a pool of PAYMENT_WORKERS threads; the order goes processing -> paid/failed.
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'stripe')
+PAYMENT_ASYNC = os.getenv('PAYMENT_ASYNC', 'False') == 'True'
+PAYMENT_WORKERS = int(os.getenv('PAYMENT_WORKERS', 8))
+PAYMENT_SIMULATOR_LATENCY = float(os.getenv('PAYMENT_SIMULATOR_LATENCY', 0.5))
+PAYMENT_SIMULATOR_FAILURE_RATE = float(os.getenv('PAYMENT_SIMULATOR_FAILURE_RATE', 0.0))
+# `manage.py reconcile_payments` retries the charge of orders left processing longer than
+# PAYMENT_STUCK_AFTER (a crashed worker, an unknown gateway outcome) under the same idempotency
+# key, and fails those still unresolved after PAYMENT_GIVE_UP_AFTER. Stripe keeps keys for 24h.
+PAYMENT_STUCK_AFTER = datetime.timedelta(minutes=int(os.getenv('PAYMENT_STUCK_AFTER_MINUTES', 10)))
+PAYMENT_GIVE_UP_AFTER = datetime.timedelta(hours=int(os.getenv('PAYMENT_GIVE_UP_AFTER_HOURS', 23)))
+
+
+# Order confirmation emails go through the outbox and are sent by `manage.py drain_outbox`.
+# Point BREVO_API_URL at `manage.py fake_brevo` to run without a Brevo account.
+SENDER_EMAIL = os.getenv('SENDER_EMAIL')
+BREVO_API_KEY = os.getenv('BREVO_API_KEY')
+BREVO_API_URL = os.getenv('BREVO_API_URL', 'https://api.brevo.com/v3/smtp/email')
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', 4))
+OUTBOX_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_RETRY_BACKOFF = datetime.timedelta(seconds=30)
+OUTBOX_RETRY_BACKOFF_MAX = datetime.timedelta(hours=1)
+# A claimed message is left alone by other workers for this long.
+OUTBOX_CLAIM_LEASE = datetime.timedelta(minutes=5)
+
+
+# Product image variants
+# Every uploaded image gets a resized copy per size (in its own format and as WebP)
+# plus a full-size WebP copy, generated by a pool of worker processes.
+# Set PRODUCT_IMAGE_WORKERS=0 to generate them inline instead.
+
+PRODUCT_IMAGE_VARIANT_SIZES = {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+}
+PRODUCT_IMAGE_QUALITY = int(os.getenv('PRODUCT_IMAGE_QUALITY', 80))
+PRODUCT_IMAGE_WORKERS = int(os.getenv('PRODUCT_IMAGE_WORKERS', 2))
+
+
+# File uploads
+# https://docs.djangoproject.com/en/4.2/ref/settings/#file-upload-settings
+# Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temporary file in
+# chunks instead of being held in memory.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 2621440))
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR')
+DATA_UPLOAD_MAX_NUMBER_FILES = int(os.getenv('DATA_UPLOAD_MAX_NUMBER_FILES', 100))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -119,6 +266,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing. PASSWORD_HASHER picks the hasher new and rehashed passwords use; the
+# others stay listed so existing hashes still verify and are upgraded on the next login.
+# argon2 and bcrypt need the argon2-cffi / bcrypt packages.
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+# Threads the async login/signup views hash passwords on; bounds the CPU a login spike can take.
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', min(4, os.cpu_count() or 1)))
+
+# The API authenticates with JWTs; a database session on login is only needed for browser use.
+LOGIN_CREATES_SESSION = os.getenv('LOGIN_CREATES_SESSION', 'False') == 'True'
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -0,0 +1,174 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+RATE_PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counter (
+    scope TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (scope, outcome)
+) WITHOUT ROWID;
+"""
+
+# Take one token if, after refilling for the time elapsed, there is one to take. When there
+# isn't, the WHERE clause skips the update and nothing is returned.
+CONSUME = """
+INSERT INTO bucket (key, tokens, updated) VALUES (:key, :capacity - 1, :now)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - 1,
+    updated = :now
+WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+RETURNING tokens
+"""
+
+COUNT = """
+INSERT INTO counter (scope, outcome, hits) VALUES (?, ?, 1)
+ON CONFLICT (scope, outcome) DO UPDATE SET hits = hits + 1
+"""
+
+
+def parse_rate(rate):
+    """ '10/min' -> tokens per second. """
+    count, period = rate.split("/")
+    return int(count) / RATE_PERIODS[period.strip().lower()]
+
+
+class TokenBucketStore:
+    """
+        Token buckets in a small SQLite file, by default on /dev/shm, shared by every worker
+        process on the host. Each check is a single atomic UPSERT, so concurrent processes
+        never hand out the same token twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # A connection must not cross a fork; worker processes open their own.
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few updates in a crash only means a little extra allowance.
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.executescript(SCHEMA)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def consume(self, key, capacity, rate, now=None):
+        """ Take a token from bucket `key`. Returns (allowed, seconds until the next token). """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        params = {"key": key, "capacity": capacity, "rate": rate, "now": now}
+        if connection.execute(CONSUME, params).fetchone() is not None:
+            return True, 0.0
+
+        row = connection.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+        tokens = min(capacity, row[0] + (now - row[1]) * rate) if row else 0
+        if random.random() < 0.001:
+            self.prune(now)
+        return False, max(0.0, (1 - tokens) / rate)
+
+    def count(self, scope, outcome):
+        self._connection().execute(COUNT, (scope, outcome))
+
+    def prune(self, now=None, idle=86400):
+        """ Drop buckets untouched for `idle` seconds; they would be full again anyway. """
+        now = time.time() if now is None else now
+        self._connection().execute("DELETE FROM bucket WHERE updated < ?", (now - idle,))
+
+    def stats(self):
+        stats = {}
+        for scope, outcome, hits in self._connection().execute("SELECT scope, outcome, hits FROM counter"):
+            stats.setdefault(scope, {"allowed": 0, "throttled": 0})[outcome] = hits
+        return stats
+
+    def reset(self):
+        self._connection().executescript("DELETE FROM bucket; DELETE FROM counter;")
+
+
+bucket_store = TokenBucketStore(settings.RATE_LIMIT_DB)
+
+
+def rate_limit_key(request, scope, per):
+    user = getattr(request, "user", None)
+    if per == "user" and user is not None and user.is_authenticated:
+        return f"{scope}:user:{user.pk}"
+    # Not X-Forwarded-For, which any client can set. Behind a trusted proxy uvicorn has already
+    # replaced REMOTE_ADDR with the client address (gunicorn.conf.py, forwarded_allow_ips).
+    return f"{scope}:ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def check_rate_limit(request, scope):
+    """
+        Apply the RATE_LIMITS entry of `scope` to this request.
+        Returns (allowed, retry_after seconds); unconfigured scopes are always allowed.
+    """
+    config = settings.RATE_LIMITS.get(scope)
+    if not settings.RATE_LIMIT_ENABLED or config is None:
+        return True, 0
+    rate = parse_rate(config["rate"])
+    capacity = config.get("burst") or max(1, round(rate * RATE_PERIODS["min"]))
+    allowed, wait = bucket_store.consume(
+        rate_limit_key(request, scope, config.get("per", "ip")), capacity, rate
+    )
+    bucket_store.count(scope, "allowed" if allowed else "throttled")
+    return allowed, math.ceil(wait)
+
+
+def throttled_response(request, scope):
+    """
+        Rate limiting for plain (non-DRF) views: the 429 response to return, or None when
+        the request may go ahead. Same body and Retry-After header as DRF's throttled answer.
+    """
+    allowed, retry_after = check_rate_limit(request, scope)
+    if allowed:
+        return None
+    response = JsonResponse(
+        {"detail": f"Request was throttled. Expected available in {retry_after} seconds."},
+        status=429,
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+        DRF throttle backed by bucket_store. The scope comes from the class (subclasses for
+        function views) or the view's `throttle_scope`; DRF answers 429 with Retry-After.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        scope = self.scope or getattr(view, "throttle_scope", None)
+        if scope is None:
+            return True
+        allowed, self.retry_after = check_rate_limit(request, scope)
+        return allowed
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = "login"
+
+
+class SignupThrottle(TokenBucketThrottle):
+    scope = "signup"
@@ -3,7 +3,7 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 # Local imports goes here!
-from .views import show_endpoints
+from .views import show_endpoints, throttle_stats_view
 
 urlpatterns = [
     path("", show_endpoints, name='show-all-available-endpoints'),
@@ -14,6 +14,7 @@ urlpatterns = [
     path("api/v1/products/", include('products.urls')),
     path("api/v1/carts/", include('carts.urls')),
     path("api/v1/orders/", include('orders.urls')),
+    path("api/v1/throttle-stats/", throttle_stats_view, name='throttle-stats'),
 ]
 
 
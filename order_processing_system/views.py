@@ -1,4 +1,10 @@
 from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+# Local imports goes here!
+from .throttling import bucket_store
 
 def show_endpoints(request):
     base_url = "http://127.0.0.1:8000"
@@ -11,6 +17,9 @@ def show_endpoints(request):
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/users/signup/", "Description": "Register a new user"},
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/users/login/", "Description": "View to login a user"},
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/users/logout/", "Description": "View to logout a user"},
+        {"Method": "POST", "Endpoint": f"{base_url}/api/v1/users/async/signup/", "Description": "Register a new user, hashing off the request thread (ASGI)"},
+        {"Method": "POST", "Endpoint": f"{base_url}/api/v1/users/async/login/", "Description": "Login a user, hashing off the request thread (ASGI)"},
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/users/auth-cache-stats/", "Description": "Authenticated-user cache hit/miss counters (admin only)"},
     ]
     endpoints.extend(user_endpoints)
 
@@ -21,6 +30,9 @@ def show_endpoints(request):
         {"Method": "GET/POST", "Endpoint": f"{base_url}/api/v1/img-products/<int:product_id>/images/", "Description": "List and create product images"},
         {"Method": "GET/PUT/DELETE", "Endpoint": f"{base_url}/api/v1/img-products/<int:product_id>/images/<int:image_id>/", "Description": "Retrieve, update, or delete a product image"},
         {"Method": "DELETE", "Endpoint": f"{base_url}/api/v1/img-products/<int:product_id>/images/delete-all/", "Description": "Delete all images of a product"},
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/products/search/?q=<query>", "Description": "Full-text search over product names and descriptions"},
+        {"Method": "POST", "Endpoint": f"{base_url}/api/v1/products/import/", "Description": "Bulk import products from a CSV or NDJSON file (admin only)"},
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/products/cache-stats/", "Description": "Product cache hit/miss counters (admin only)"},
     ]
     endpoints.extend(product_endpoints)
 
@@ -30,6 +42,8 @@ def show_endpoints(request):
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/orders/<int:pk>/cancel/", "Description": "Cancel an order"},
         {"Method": "GET", "Endpoint": f"{base_url}/api/v1/orders/<int:pk>/", "Description": "Retrieve an order"},
         {"Method": "GET", "Endpoint": f"{base_url}/api/v1/orders/all/", "Description": "List all orders"},
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/orders/analytics/", "Description": "Sales per day and top products from the rollup tables (admin only)"},
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/orders/export/", "Description": "Stream order lines as CSV or NDJSON, optionally gzipped (admin only)"},
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/orders/<int:pk>/payment/", "Description": "Process payment for an order"},
     ]
     endpoints.extend(order_endpoints)
@@ -39,7 +53,18 @@ def show_endpoints(request):
         {"Method": "GET", "Endpoint": f"{base_url}/api/v1/cart/", "Description": "Retrieve the user's cart"},
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/cart/add/<int:product_id>/", "Description": "Add a product to the cart"},
         {"Method": "POST", "Endpoint": f"{base_url}/api/v1/cart/remove/<int:product_id>/", "Description": "Remove a product from the cart"},
+        {"Method": "POST", "Endpoint": f"{base_url}/api/v1/cart/batch/", "Description": "Add and remove many products in one request"},
     ]
     endpoints.extend(cart_endpoints)
 
+    endpoints.append(
+        {"Method": "GET", "Endpoint": f"{base_url}/api/v1/throttle-stats/", "Description": "Allowed/throttled request counters per rate-limit scope (admin only)"}
+    )
+
     return JsonResponse({"endpoints": endpoints}, json_dumps_params={'indent': 2})
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def throttle_stats_view(request):
+    return Response(bucket_store.stats(), status=status.HTTP_200_OK)
@@ -1,7 +1,10 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Order, OrderItem
+from .models import IdempotencyKey, Order, OrderItem, OrderTransition, OutboxMessage
 
 admin.site.register(Order)
-admin.site.register(OrderItem)
\ No newline at end of file
+admin.site.register(OrderItem)
+admin.site.register(IdempotencyKey)
+admin.site.register(OutboxMessage)
+admin.site.register(OrderTransition)
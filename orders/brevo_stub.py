@@ -0,0 +1,84 @@
+"""
+    A local stand-in for Brevo's transactional email endpoint, for development and tests.
+    Run it with `manage.py fake_brevo`, or start_brevo_stub() in-process, and point
+    BREVO_API_URL at it.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class BrevoStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.lock:
+            scripted = server.scripted.popleft() if server.scripted else None
+        if scripted is not None:
+            self._reply(scripted, {"code": "scripted_failure", "message": f"Scripted HTTP {scripted}"})
+            return
+        if random.random() < server.failure_rate:
+            self._reply(503, {"code": "service_unavailable", "message": "Simulated failure"})
+            return
+        if not self.headers.get("api-key"):
+            self._reply(401, {"code": "unauthorized", "message": "Key not found"})
+            return
+        try:
+            email = json.loads(body)
+        except ValueError:
+            self._reply(400, {"code": "bad_request", "message": "Invalid JSON"})
+            return
+
+        message_id = f"<{uuid.uuid4()}@brevo-stub>"
+        with server.lock:
+            server.messages.append(email)
+        self._reply(201, {"messageId": message_id})
+
+    def _reply(self, status_code, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class BrevoStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, failure_rate=0.0, verbose=False):
+        super().__init__(address, BrevoStubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.messages = []
+        self.scripted = deque()
+        self.lock = threading.Lock()
+
+    def fail_next(self, *status_codes):
+        """ Answer the next requests with these status codes, one each, before behaving normally. """
+        with self.lock:
+            self.scripted.extend(status_codes)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3/smtp/email"
+
+
+def start_brevo_stub(host="127.0.0.1", port=0, **options):
+    """ Serve the stub on a background thread; port 0 picks a free port. Call shutdown() when done. """
+    server = BrevoStubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
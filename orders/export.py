@@ -0,0 +1,141 @@
+import csv
+import datetime
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+# Local imports goes here!
+from .models import OrderItem
+
+EXPORT_FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Column name -> OrderItem lookup. One row per order line, with its order and product.
+EXPORT_COLUMNS = {
+    "order_id": "order_id",
+    "order_created_at": "order__created_at",
+    "order_status": "order__status",
+    "order_total": "order__total_amount",
+    "user_id": "order__user_id",
+    "user_email": "order__user__email",
+    "item_id": "id",
+    "product_id": "product_id",
+    "product_name": "product__name",
+    "quantity": "quantity",
+    "price": "price",
+}
+
+BLOCK_SIZE = 64 * 1024
+
+
+def day_bounds(start=None, end=None):
+    """ Aware datetimes covering whole days from `start` to `end` inclusive, in the current time zone. """
+    tz = timezone.get_current_timezone()
+    lower = datetime.datetime.combine(start, datetime.time.min, tzinfo=tz) if start else None
+    upper = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz) if end else None
+    return lower, upper
+
+
+def export_rows(start=None, end=None, status=None, chunk_size=2000):
+    """
+        Yield order lines as tuples in EXPORT_COLUMNS order, oldest order first.
+        One joined query read in chunks of `chunk_size` rows: memory does not grow with
+        the size of the range, and no model instances are built.
+    """
+    lines = OrderItem.objects.all()
+    lower, upper = day_bounds(start, end)
+    if lower:
+        lines = lines.filter(order__created_at__gte=lower)
+    if upper:
+        lines = lines.filter(order__created_at__lt=upper)
+    if status:
+        lines = lines.filter(order__status=status)
+    return (
+        lines.order_by("order__created_at", "order_id", "id")
+        .values_list(*EXPORT_COLUMNS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+class _Echo:
+    """ csv.writer target that hands back each formatted line instead of storing it. """
+
+    def write(self, value):
+        return value
+
+
+def _plain(row):
+    # Full-precision timestamps in both formats (DjangoJSONEncoder would cut them to ms).
+    return [value.isoformat() if isinstance(value, datetime.datetime) else value for value in row]
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(list(EXPORT_COLUMNS))
+    for row in rows:
+        yield writer.writerow(_plain(row))
+
+
+def ndjson_lines(rows):
+    columns = list(EXPORT_COLUMNS)
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, _plain(row)))) + "\n"
+
+
+def encoded_blocks(lines, block_size=BLOCK_SIZE):
+    """ Join lines into byte blocks of about `block_size`, so each write to the client is worth it. """
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= block_size:
+            yield "".join(block).encode("utf-8")
+            block, size = [], 0
+    if block:
+        yield "".join(block).encode("utf-8")
+
+
+def gzip_blocks(blocks, level=6):
+    """ Compress a stream of byte blocks into one gzip member as it goes. """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_orders(export_format="csv", start=None, end=None, status=None, compress=False, chunk_size=2000):
+    """ The whole export as an iterator of byte blocks, ready for StreamingHttpResponse or a file. """
+    rows = export_rows(start=start, end=end, status=status, chunk_size=chunk_size)
+    lines = csv_lines(rows) if export_format == "csv" else ndjson_lines(rows)
+    blocks = encoded_blocks(lines)
+    return gzip_blocks(blocks) if compress else blocks
+
+
+async def async_blocks(blocks):
+    """
+        The same blocks as an async iterator, for StreamingHttpResponse under ASGI (Django 4.2
+        reads a sync iterator there with sync_to_async(list), i.e. the whole export at once).
+        Each block is produced in the sync thread, where the export's database cursor lives.
+    """
+    next_block = sync_to_async(next)
+    try:
+        while (block := await next_block(blocks, None)) is not None:
+            yield block
+    finally:
+        # Also on client disconnect: let the generators close their cursor.
+        await sync_to_async(blocks.close)()
+
+
+def export_file_name(export_format, start=None, end=None, compress=False):
+    parts = ["orders"]
+    if start:
+        parts.append(start.isoformat())
+    if end:
+        parts.append(end.isoformat())
+    name = "_".join(parts) + f".{export_format}"
+    return name + ".gz" if compress else name
@@ -0,0 +1,160 @@
+import functools
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+# Local imports goes here!
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    """ Hash of what the key promises to repeat: the method, the path and the payload. """
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method} {request.path}\n{payload}".encode("utf-8")
+    ).hexdigest()
+
+
+def claim_key(user, key, request_hash):
+    """
+        Insert the key row before doing any work; the unique (user, key) constraint makes
+        exactly one concurrent request the owner. Returns (record, claimed).
+        Expired keys are dropped and reclaimed, and an unfinished request whose owner has
+        held it past IDEMPOTENCY_LOCK_TIMEOUT (e.g. a crashed worker) can be taken over.
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user, key=key, request_hash=request_hash, locked_at=now
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Released by its owner between our insert and this read.
+            continue
+        if record.created_at < now - settings.IDEMPOTENCY_KEY_TTL:
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            continue
+        if record.response_status is None and record.locked_at < now - settings.IDEMPOTENCY_LOCK_TIMEOUT:
+            taken = IdempotencyKey.objects.filter(
+                pk=record.pk, response_status__isnull=True, locked_at=record.locked_at
+            ).update(locked_at=now, request_hash=request_hash)
+            if taken:
+                record.locked_at, record.request_hash = now, request_hash
+                return record, True
+        return record, False
+    return record, False
+
+
+def wait_for_response(record):
+    """
+        Poll the key row until the request holding it stores its response.
+        Returns the finished record, or None if it was released or is still running.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while record.response_status is None:
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    return record
+
+
+def store_response(record, response):
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=response.status_code, response_body=response.data
+    )
+
+
+def release_key(record):
+    # Server errors are not remembered, so a retry with the same key runs the request again.
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def idempotent(handler):
+    """
+        Make an APIView handler honour the Idempotency-Key request header.
+
+        The first request with a key runs the handler and stores its response; retries with
+        the same key get that response back (with an Idempotent-Replayed header) without
+        running it again. A retry that arrives while the first request is still running
+        waits for it and replays its outcome. Reusing a key for a different request is a 422.
+        Requests without the header, or from anonymous users, are handled as before.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response({'error': 'Idempotency-Key is too long.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, request_hash)
+
+        if not claimed:
+            if record.request_hash != request_hash:
+                return Response(
+                    {'error': 'This Idempotency-Key was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            finished = wait_for_response(record)
+            if finished is None:
+                logger.warning(f'Idempotency-Key {key} is still in flight for user {request.user.id}')
+                return Response(
+                    {'error': 'A request with this Idempotency-Key is still being processed, please retry.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                finished.response_body,
+                status=finished.response_status,
+                headers={REPLAYED_HEADER: 'true'},
+            )
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            release_key(record)
+            raise
+        if response.status_code >= 500:
+            release_key(record)
+        else:
+            store_response(record, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=1000, now=None):
+    """ Delete keys older than IDEMPOTENCY_KEY_TTL in batches off the created_at index. """
+    cutoff = (now or timezone.now()) - settings.IDEMPOTENCY_KEY_TTL
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
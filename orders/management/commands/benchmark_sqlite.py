@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Local imports goes here!
+from order_processing_system.db.base import run_init_command
+
+# What a stock connection gets from Django's SQLite backend: rollback journal, synchronous=FULL,
+# a 5 second busy timeout and deferred transactions.
+DEFAULT_PROFILE = {"init_command": "", "transaction_mode": None}
+
+SCHEMA = """
+CREATE TABLE product (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL,
+                      stock INTEGER NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE cart_item (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL REFERENCES product (id),
+                        quantity INTEGER NOT NULL, created_at REAL NOT NULL);
+CREATE INDEX cart_item_product_idx ON cart_item (product_id);
+"""
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA foreign_keys = ON")
+    run_init_command(conn, profile["init_command"])
+    return conn
+
+
+def create_database(path, profile, products):
+    conn = connect(path, profile)
+    conn.executescript(SCHEMA)
+    now = time.time()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO product (id, name, price, stock, updated_at) VALUES (?, ?, ?, ?, ?)",
+        ((pk, f"product {pk}", 9.99, 10 ** 9, now) for pk in range(1, products + 1)),
+    )
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def writer(path, profile, products, start, deadline, results):
+    """ Cart-style writes: read the stock, take some, add a line; one transaction each. """
+    conn = connect(path, profile)
+    begin = f"BEGIN {profile['transaction_mode']}" if profile["transaction_mode"] else "BEGIN"
+    done = locked = 0
+    latencies = []
+    start.wait()
+    while time.time() < deadline:
+        pk = random.randint(1, products)
+        began = time.perf_counter()
+        try:
+            conn.execute(begin)
+            stock = conn.execute("SELECT stock FROM product WHERE id = ?", (pk,)).fetchone()[0]
+            conn.execute(
+                "UPDATE product SET stock = ?, updated_at = ? WHERE id = ?", (stock - 1, time.time(), pk)
+            )
+            conn.execute(
+                "INSERT INTO cart_item (product_id, quantity, created_at) VALUES (?, 1, ?)", (pk, time.time())
+            )
+            conn.execute("COMMIT")
+            done += 1
+            latencies.append(time.perf_counter() - began)
+        except sqlite3.OperationalError:
+            # "database is locked": the transaction is lost, as a request would be.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            locked += 1
+    results.put(("write", done, locked, latencies))
+
+
+def reader(path, profile, products, start, deadline, results):
+    """ Catalog-style reads: a page of products, and one product with its cart lines. """
+    conn = connect(path, profile)
+    done = locked = 0
+    latencies = []
+    start.wait()
+    while time.time() < deadline:
+        pk = random.randint(1, products)
+        began = time.perf_counter()
+        try:
+            conn.execute(
+                "SELECT id, name, price, stock FROM product WHERE id >= ? ORDER BY id LIMIT 20", (pk,)
+            ).fetchall()
+            conn.execute(
+                "SELECT p.stock, COUNT(c.id) FROM product p LEFT JOIN cart_item c ON c.product_id = p.id "
+                "WHERE p.id = ? GROUP BY p.id", (pk,)
+            ).fetchone()
+            done += 1
+            latencies.append(time.perf_counter() - began)
+        except sqlite3.OperationalError:
+            locked += 1
+    results.put(("read", done, locked, latencies))
+
+
+def run_profile(profile, readers, writers, duration, products):
+    directory = tempfile.mkdtemp(prefix="sqlite-benchmark-")
+    path = os.path.join(directory, "benchmark.sqlite3")
+    create_database(path, profile, products)
+
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration + 1
+    workers = [
+        multiprocessing.Process(target=target, args=(path, profile, products, start, deadline, results))
+        for target, count in ((writer, writers), (reader, readers))
+        for _ in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    # Give every process a second to connect so all of them start together.
+    time.sleep(max(0.0, deadline - duration - time.time()))
+    start.set()
+
+    totals = {"read": [0, 0, []], "write": [0, 0, []]}
+    for _ in workers:
+        kind, done, locked, latencies = results.get()
+        totals[kind][0] += done
+        totals[kind][1] += locked
+        totals[kind][2].extend(latencies)
+    for worker in workers:
+        worker.join()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return totals
+
+
+def percentile(latencies, fraction):
+    if not latencies:
+        return 0.0
+    return sorted(latencies)[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure read throughput during heavy writes on a scratch SQLite file, with Django's "
+        "default connection setup and with the tuned profile from settings.SQLITE_TUNED_OPTIONS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Reader processes.")
+        parser.add_argument("--writers", type=int, default=4, help="Writer processes.")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per profile.")
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument(
+            "--profile", choices=("default", "tuned", "both"), default="both",
+        )
+
+    def handle(self, *args, **options):
+        profiles = {"default": DEFAULT_PROFILE, "tuned": settings.SQLITE_TUNED_OPTIONS}
+        if options["profile"] != "both":
+            profiles = {options["profile"]: profiles[options["profile"]]}
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['duration']}s per profile, {options['products']} products"
+        )
+        header = (
+            f"{'profile':<8} {'reads/s':>9} {'read p50':>9} {'read p99':>9} {'read err':>9} "
+            f"{'writes/s':>9} {'write p99':>10} {'locked':>7}"
+        )
+        self.stdout.write(header)
+        for name, profile in profiles.items():
+            totals = run_profile(
+                profile, options["readers"], options["writers"], options["duration"], options["products"]
+            )
+            reads, read_errors, read_latencies = totals["read"]
+            writes, locked, write_latencies = totals["write"]
+            self.stdout.write(
+                f"{name:<8} {reads / options['duration']:>9.0f} "
+                f"{statistics.median(read_latencies) * 1000 if read_latencies else 0:>7.2f}ms "
+                f"{percentile(read_latencies, 0.99):>7.2f}ms {read_errors:>9} "
+                f"{writes / options['duration']:>9.0f} {percentile(write_latencies, 0.99):>8.2f}ms {locked:>7}"
+            )
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# Local imports goes here!
+from orders.outbox import build_session, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send pending outbox messages (order confirmation emails)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--concurrency", type=int, default=None,
+            help="Deliveries in flight at once (default OUTBOX_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep running, draining every --interval seconds.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"] or settings.OUTBOX_CONCURRENCY
+        # One session for the life of the worker keeps connections to Brevo alive between runs.
+        session = build_session(concurrency)
+        while True:
+            close_old_connections()
+            stats = drain_outbox(
+                batch_size=options["batch_size"], concurrency=concurrency, session=session
+            )
+            self.stdout.write(
+                f"sent={stats['sent']} retried={stats['retried']} failed={stats['failed']} "
+                f"batches={stats['batches']} elapsed={stats['elapsed']}s"
+            )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
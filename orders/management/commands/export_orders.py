@@ -0,0 +1,45 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Local imports goes here!
+from orders.export import EXPORT_FORMATS, export_orders
+
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Stream order lines with their order and product as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--start", type=parse_day, help="First order day, YYYY-MM-DD.")
+        parser.add_argument("--end", type=parse_day, help="Last order day, YYYY-MM-DD.")
+        parser.add_argument("--status")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--output", "-o", help="File to write; standard output by default.")
+
+    def handle(self, *args, **options):
+        blocks = export_orders(
+            export_format=options["format"],
+            start=options["start"],
+            end=options["end"],
+            status=options["status"],
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                written = sum(output.write(block) for block in blocks)
+            self.stderr.write(f"Wrote {written} bytes to {options['output']}")
+        else:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+# Local imports goes here!
+from orders.brevo_stub import BrevoStubServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in for Brevo's email API; set BREVO_API_URL to the printed URL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before replying.")
+        parser.add_argument(
+            "--failure-rate", type=float, default=0.0,
+            help="Fraction of requests answered with 503.",
+        )
+
+    def handle(self, *args, **options):
+        server = BrevoStubServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            failure_rate=options["failure_rate"],
+            verbose=True,
+        )
+        self.stdout.write(f"Fake Brevo listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Received {len(server.messages)} emails")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+# Local imports goes here!
+from orders.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollup tables from paid and cancelled orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        stats = rebuild_sales_rollups(batch_size=options["batch_size"])
+        self.stdout.write(
+            f"daily_rows={stats['days']} product_rows={stats['product_rows']} elapsed={stats['elapsed']}s"
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# Local imports goes here!
+from orders.payments import reconcile_payments
+
+
+class Command(BaseCommand):
+    help = "Retry or fail payments stuck in processing longer than PAYMENT_STUCK_AFTER."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep running, reconciling every --interval seconds.",
+        )
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            stats = reconcile_payments()
+            self.stdout.write(
+                f"paid={stats['paid']} failed={stats['failed']} unknown={stats['unknown']} "
+                f"given_up={stats['given_up']}"
+            )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
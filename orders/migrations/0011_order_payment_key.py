@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
 from products.models import Product
 from decimal import Decimal
@@ -6,13 +8,30 @@ from carts.models import Cart
 
 User = get_user_model()
 
+STATUS_CHOICES = [('pending', 'Pending'), ('processing', 'Processing'), ('paid', 'Paid'), ('failed', 'Failed'), ('cancelled', 'Cancelled')]
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, blank=True, null=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('paid', 'Paid'), ('cancelled', 'Cancelled')])
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    # Bumped by every status transition (see orders.transitions); writers compare it to
+    # the value they read instead of locking the row.
+    version = models.PositiveIntegerField(default=0)
+    payment_reference = models.CharField(max_length=255, blank=True, default='')
+    # Idempotency key of the current payment attempt, kept until the attempt ends so every
+    # retry of the same charge (see orders.payments) reaches the gateway under one key.
+    payment_key = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Order history: one user's orders, newest first, paged on created_at.
+            models.Index(fields=['user', 'created_at'], name='order_user_created_at_idx'),
+            # Date-range exports across all users.
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - User: {self.user}, Status: {self.status}, Total Amount: {self.total_amount}, Created At: {self.created_at}"
@@ -28,4 +47,127 @@ class OrderItem(models.Model):
         return f"{self.quantity}x {self.product.name} (in Order {self.order.id})"
 
 
+class OrderTransition(models.Model):
+    """
+        Append-only log of order status changes, written in the same transaction as the
+        change. from_status is empty for the order's creation.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=20, blank=True, choices=STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    version = models.PositiveIntegerField()
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    reason = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Two writers can never log the same version of an order.
+            models.UniqueConstraint(fields=['order', 'version'], name='ordertransition_unique_order_version'),
+        ]
+        indexes = [
+            models.Index(fields=['to_status', 'created_at'], name='ordertransition_status_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Order transitions are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Order transitions are append-only.")
+
+    def __str__(self):
+        return f"Order {self.order_id} v{self.version}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class DailySales(models.Model):
+    """
+        Orders that reached `status` on `day`, maintained incrementally by orders.rollups
+        and rebuilt by `manage.py rebuild_sales_rollups`.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'day'], name='dailysales_unique_status_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.orders} orders, {self.revenue}"
+
+
+class ProductDailySales(models.Model):
+    """ DailySales broken down by product. """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'day', 'product'], name='productdailysales_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'status', 'day'], name='productdailysales_product_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.day} {self.product_id} {self.status}: {self.units} units, {self.revenue}"
+
+
+class IdempotencyKey(models.Model):
+    """
+        Outcome of a request sent with an Idempotency-Key header, replayed on retries.
+        response_status stays null while the first request is still being processed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotencykey_unique_user_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} - User: {self.user_id}, Status: {self.response_status}"
+
+
+class OutboxMessage(models.Model):
+    """
+        A side effect recorded in the same transaction as the change that causes it and
+        delivered later by `manage.py drain_outbox`. The payload is the complete request
+        body, so delivery never has to read the order again.
+    """
+    ORDER_CONFIRMATION = 'order_confirmation'
+
+    kind = models.CharField(max_length=50, choices=[(ORDER_CONFIRMATION, 'Order confirmation')])
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, blank=True, null=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, default='pending', choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')])
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_attempt_idx'),
+            models.Index(fields=['claim_token'], name='outbox_claim_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} - Order: {self.order_id}, Status: {self.status}, Attempts: {self.attempts}"
@@ -0,0 +1,136 @@
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+# Local imports goes here!
+from .models import OutboxMessage
+from .utils import brevo_headers, order_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_order_confirmation_email(order, receiver_email, sender_email=None):
+    """
+        Record the confirmation email for `order`. Call it inside the transaction that marks
+        the order paid: the email is sent if and only if that transaction commits.
+    """
+    return OutboxMessage.objects.create(
+        kind=OutboxMessage.ORDER_CONFIRMATION,
+        order=order,
+        payload=order_confirmation_email(sender_email or settings.SENDER_EMAIL, receiver_email, order),
+    )
+
+
+def build_session(pool_size):
+    """ One keep-alive connection pool shared by every delivery thread. """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(brevo_headers(settings.BREVO_API_KEY))
+    return session
+
+
+def claim_messages(batch_size, now=None):
+    """
+        Take up to `batch_size` due messages, oldest first, for this worker.
+        The claim pushes next_attempt_at past OUTBOX_CLAIM_LEASE under a fresh token, so
+        concurrent workers skip them, and a crashed worker's messages come back on their own.
+    """
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    due = OutboxMessage.objects.filter(status="pending", next_attempt_at__lte=now)
+    ids = list(due.order_by("next_attempt_at").values_list("id", flat=True)[:batch_size])
+    if not ids:
+        return []
+    due.filter(id__in=ids).update(claim_token=token, next_attempt_at=now + settings.OUTBOX_CLAIM_LEASE)
+    return list(OutboxMessage.objects.filter(claim_token=token, status="pending"))
+
+
+def deliver(session, message):
+    """ POST one message. Returns (sent, retryable, error); never touches the database. """
+    try:
+        response = session.post(
+            settings.BREVO_API_URL, json=message.payload, timeout=settings.OUTBOX_HTTP_TIMEOUT
+        )
+    except requests.RequestException as e:
+        return False, True, str(e)
+    if response.ok:
+        return True, False, ""
+    retryable = response.status_code == 429 or response.status_code >= 500
+    return False, retryable, f"HTTP {response.status_code}: {response.text[:500]}"
+
+
+def retry_delay(attempts):
+    """ Exponential backoff with jitter, capped at OUTBOX_RETRY_BACKOFF_MAX. """
+    delay = min(
+        settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1), settings.OUTBOX_RETRY_BACKOFF_MAX
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def record_results(results, stats):
+    now = timezone.now()
+    sent_ids = [message.id for message, (sent, _, _) in results if sent]
+    if sent_ids:
+        OutboxMessage.objects.filter(id__in=sent_ids).update(
+            status="sent", sent_at=now, attempts=F("attempts") + 1, last_error=""
+        )
+        stats["sent"] += len(sent_ids)
+
+    for message, (sent, retryable, error) in results:
+        if sent:
+            continue
+        attempts = message.attempts + 1
+        if retryable and attempts < settings.OUTBOX_MAX_ATTEMPTS:
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                attempts=attempts, last_error=error, next_attempt_at=now + retry_delay(attempts)
+            )
+            stats["retried"] += 1
+        else:
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                status="failed", attempts=attempts, last_error=error
+            )
+            stats["failed"] += 1
+            logger.error(f"Giving up on outbox message {message.id} after {attempts} attempts: {error}")
+
+
+def drain_outbox(batch_size=None, concurrency=None, session=None):
+    """
+        Send every due outbox message, a batch at a time.
+        The HTTP calls of a batch run on `concurrency` threads over one pooled session;
+        claiming and recording results stay on the calling thread, so the worker threads
+        never open database connections. Returns counters describing the run.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    concurrency = max(1, concurrency or settings.OUTBOX_CONCURRENCY)
+    session = session or build_session(concurrency)
+    started = time.monotonic()
+    stats = {"batches": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            messages = claim_messages(batch_size)
+            if not messages:
+                break
+            outcomes = executor.map(lambda message: deliver(session, message), messages)
+            record_results(list(zip(messages, outcomes)), stats)
+            stats["batches"] += 1
+            if len(messages) < batch_size:
+                break
+
+    stats["elapsed"] = round(time.monotonic() - started, 3)
+    if stats["batches"]:
+        logger.info(
+            f"Outbox: sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']} "
+            f"in {stats['batches']} batches ({stats['elapsed']}s)"
+        )
+    return stats
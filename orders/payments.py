@@ -0,0 +1,210 @@
+import abc
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+# Local imports goes here!
+from .models import Order
+from .outbox import enqueue_order_confirmation_email
+from .transitions import InvalidTransition, TransitionConflict, transition
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    """ The gateway declined or could not complete a charge. """
+
+
+class PaymentOutcomeUnknown(PaymentError):
+    """ The gateway could not be reached or failed mid-call: the charge may or may not have happened. """
+
+
+# What charge_order() reports. Unknown outcomes leave the order processing, for the same
+# attempt to be retried later (see reconcile_payments).
+PAID, FAILED, UNKNOWN = 'paid', 'failed', 'unknown'
+
+
+class PaymentGateway(abc.ABC):
+    """ Charges money for an order; returns the gateway's reference for the charge. """
+
+    @abc.abstractmethod
+    def charge(self, amount, currency, idempotency_key):
+        """ Charge `amount` (smallest currency unit) once per key; raises PaymentError. """
+
+
+class StripeGateway(PaymentGateway):
+    def charge(self, amount, currency, idempotency_key):
+        try:
+            # Key passed per call rather than through the module-global stripe.api_key.
+            payment_intent = stripe.PaymentIntent.create(
+                amount=amount,
+                currency=currency,
+                payment_method_types=['card'],
+                api_key=settings.STRIPE_SECRET_KEY,
+                idempotency_key=idempotency_key,
+            )
+        except (stripe.APIConnectionError, stripe.APIError) as e:
+            # A timeout or server error can follow a charge Stripe did make.
+            raise PaymentOutcomeUnknown(str(e)) from e
+        except stripe.StripeError as e:
+            raise PaymentError(str(e)) from e
+        return payment_intent.id
+
+
+class SimulatedGateway(PaymentGateway):
+    """ Stands in for Stripe: waits `latency` seconds, then declines `failure_rate` of charges. """
+
+    def __init__(self, latency=None, failure_rate=None):
+        self.latency = settings.PAYMENT_SIMULATOR_LATENCY if latency is None else latency
+        self.failure_rate = settings.PAYMENT_SIMULATOR_FAILURE_RATE if failure_rate is None else failure_rate
+
+    def charge(self, amount, currency, idempotency_key):
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise PaymentError("Your card was declined (simulated).")
+        return f"sim_{uuid.uuid4().hex}"
+
+
+PAYMENT_GATEWAYS = {
+    'stripe': StripeGateway,
+    'simulator': SimulatedGateway,
+}
+
+
+def get_payment_gateway():
+    try:
+        return PAYMENT_GATEWAYS[settings.PAYMENT_GATEWAY]()
+    except KeyError:
+        raise ValueError(f"Unknown PAYMENT_GATEWAY: {settings.PAYMENT_GATEWAY}")
+
+
+def start_payment(order, actor=None):
+    """
+        Move a pending (or previously failed) order to processing under a new payment
+        attempt. Returns False if another request got there first or the order can't be
+        paid, so a charge is never started twice for the same attempt.
+    """
+    try:
+        transition(order, 'processing', actor=actor, payment_key=f"order-{order.pk}-{uuid.uuid4().hex}")
+    except (InvalidTransition, TransitionConflict):
+        return False
+    return True
+
+
+def complete_payment(order, reference):
+    """ Mark a processing order paid and queue its confirmation email in the same transaction. """
+    try:
+        with transaction.atomic():
+            transition(order, 'paid', payment_reference=reference)
+            enqueue_order_confirmation_email(order, order.user.email)
+    except (InvalidTransition, TransitionConflict) as e:
+        logger.error(f'Charged order {order.pk} could not be marked paid: {e}')
+        return False
+    return True
+
+
+def fail_payment(order, reason=''):
+    try:
+        transition(order, 'failed', reason=reason[:255])
+    except (InvalidTransition, TransitionConflict) as e:
+        logger.warning(f'Order {order.pk} could not be marked failed: {e}')
+        return False
+    return True
+
+
+def charge_order(order, gateway=None):
+    """
+        Charge a processing order through the configured gateway and record the outcome:
+        PAID, FAILED, or UNKNOWN when the gateway can't tell whether it took the money.
+        An unknown outcome leaves the order processing; charging it again reuses the
+        attempt's idempotency key, so the gateway charges it at most once.
+    """
+    gateway = gateway or get_payment_gateway()
+    try:
+        reference = gateway.charge(
+            amount=int(order.total_amount * 100),
+            currency='usd',
+            idempotency_key=order.payment_key,
+        )
+    except PaymentOutcomeUnknown as e:
+        logger.error(f'Payment outcome unknown for order {order.pk}, leaving it processing: {e}')
+        return UNKNOWN
+    except PaymentError as e:
+        logger.warning(f'Payment failed for order {order.pk}: {e}')
+        fail_payment(order, str(e))
+        return FAILED
+    except Exception as e:
+        logger.error(f'Error charging order {order.pk}, leaving it processing: {e}')
+        return UNKNOWN
+    if not complete_payment(order, reference):
+        # Another worker may have recorded this attempt first.
+        return PAID if Order.objects.filter(pk=order.pk, status='paid').exists() else UNKNOWN
+    logger.info(f'Successful payment for order: {order.pk}')
+    return PAID
+
+
+def reconcile_payments(gateway=None, now=None):
+    """
+        Settle orders stuck in processing: a worker died mid-charge or the gateway's answer
+        was unknown. Each is charged again under its attempt's idempotency key, which the
+        gateway answers with the original charge if there was one. Orders still unresolved
+        after PAYMENT_GIVE_UP_AFTER are failed so they can be retried or cancelled.
+        Returns counters by outcome.
+    """
+    now = now or timezone.now()
+    gateway = gateway or get_payment_gateway()
+    stats = {PAID: 0, FAILED: 0, UNKNOWN: 0, 'given_up': 0}
+    # updated_at is when the order entered processing: nothing else writes a processing order.
+    stuck = Order.objects.select_related('user').filter(
+        status='processing', updated_at__lt=now - settings.PAYMENT_STUCK_AFTER
+    )
+    for order in stuck.order_by('updated_at').iterator(chunk_size=100):
+        if order.updated_at < now - settings.PAYMENT_GIVE_UP_AFTER:
+            logger.error(f'Giving up on payment of order {order.pk}; check the gateway for {order.payment_key}')
+            if fail_payment(order, 'Payment outcome unknown'):
+                stats['given_up'] += 1
+            continue
+        stats[charge_order(order, gateway)] += 1
+    return stats
+
+
+_executor = None
+
+
+def get_executor():
+    """ Thread pool shared by the whole process, created on first use. """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PAYMENT_WORKERS, thread_name_prefix='payments'
+        )
+    return _executor
+
+
+def _charge_in_background(order_id):
+    try:
+        order = Order.objects.select_related('user').get(pk=order_id)
+        charge_order(order)
+    except Exception as e:
+        # The order stays processing; reconcile_payments picks it up.
+        logger.error(f'Error charging order {order_id}: {e}')
+    finally:
+        # Close the connection this pool thread opened.
+        connections.close_all()
+
+
+def queue_payment(order):
+    """
+        Charge the order on the payment pool once the surrounding transaction commits.
+        The request thread returns straight away; PAYMENT_WORKERS bounds the charges in
+        flight, whatever the gateway's latency.
+    """
+    transaction.on_commit(lambda: get_executor().submit(_charge_in_background, order.pk))
@@ -0,0 +1,162 @@
+import logging
+import time
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+# Local imports goes here!
+from .models import DailySales, OrderItem, OrderTransition, ProductDailySales
+
+logger = logging.getLogger(__name__)
+
+# Statuses the sales rollups count. Both are final, so an order is counted once, on the
+# day it reached one of them.
+ROLLUP_STATUSES = ('paid', 'cancelled')
+CENTS = Decimal('0.01')
+
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def record_sale(order_id, status, at=None):
+    """
+        Add one order to the rollups of `status` for the day of `at`: one INSERT ... SELECT
+        ... ON CONFLICT DO UPDATE per table, straight from the order's items. Call it in the
+        transaction that moves the order to `status` (orders.transitions does).
+    """
+    day = connection.ops.adapt_datefield_value(timezone.localdate(at or timezone.now()))
+    quote = connection.ops.quote_name
+    item_table = quote(OrderItem._meta.db_table)
+    product_table = quote(ProductDailySales._meta.db_table)
+    daily_table = quote(DailySales._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {product_table} (day, product_id, status, orders, units, revenue) "
+            f"SELECT %s, product_id, %s, 1, SUM(quantity), SUM(quantity * price) "
+            f"FROM {item_table} WHERE order_id = %s GROUP BY product_id "
+            f"ON CONFLICT (status, day, product_id) DO UPDATE SET "
+            f"orders = {product_table}.orders + excluded.orders, "
+            f"units = {product_table}.units + excluded.units, "
+            f"revenue = {product_table}.revenue + excluded.revenue",
+            [day, status, order_id],
+        )
+        cursor.execute(
+            f"INSERT INTO {daily_table} (day, status, orders, units, revenue) "
+            f"SELECT %s, %s, 1, COALESCE(SUM(quantity), 0), COALESCE(SUM(quantity * price), 0) "
+            f"FROM {item_table} WHERE order_id = %s "
+            f"ON CONFLICT (status, day) DO UPDATE SET "
+            f"orders = {daily_table}.orders + excluded.orders, "
+            f"units = {daily_table}.units + excluded.units, "
+            f"revenue = {daily_table}.revenue + excluded.revenue",
+            [day, status, order_id],
+        )
+
+
+def _reached_day():
+    """
+        Day an order item's order reached its (final) status: the logged transition, or
+        updated_at for orders that predate the transition log.
+    """
+    transition_at = OrderTransition.objects.filter(
+        order_id=OuterRef("order_id"), to_status=OuterRef("order__status")
+    ).order_by("-version").values("created_at")[:1]
+    return TruncDate(Coalesce(Subquery(transition_at), F("order__updated_at")))
+
+
+def rebuild_sales_rollups(batch_size=5000):
+    """
+        Recompute both rollup tables from the orders, for backfills and repairs.
+        Runs in one transaction, so readers see the old figures until it commits.
+        Returns counters describing the run.
+    """
+    started = time.monotonic()
+    stats = {"days": 0, "product_rows": 0}
+
+    product_rows = (
+        OrderItem.objects.filter(order__status__in=ROLLUP_STATUSES)
+        .annotate(day=_reached_day(), rollup_status=F("order__status"))
+        .values("day", "product_id", "rollup_status")
+        .annotate(orders=Count("order_id", distinct=True), units=Sum("quantity"), revenue=Sum(LINE_TOTAL))
+        .order_by()
+    )
+    daily_rows = (
+        OrderItem.objects.filter(order__status__in=ROLLUP_STATUSES)
+        .annotate(day=_reached_day(), rollup_status=F("order__status"))
+        .values("day", "rollup_status")
+        .annotate(orders=Count("order_id", distinct=True), units=Sum("quantity"), revenue=Sum(LINE_TOTAL))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        ProductDailySales.objects.all().delete()
+        DailySales.objects.all().delete()
+
+        batch = []
+        for row in product_rows.iterator(chunk_size=batch_size):
+            batch.append(ProductDailySales(
+                day=row["day"], product_id=row["product_id"], status=row["rollup_status"],
+                orders=row["orders"], units=row["units"], revenue=row["revenue"],
+            ))
+            if len(batch) >= batch_size:
+                ProductDailySales.objects.bulk_create(batch)
+                stats["product_rows"] += len(batch)
+                batch = []
+        ProductDailySales.objects.bulk_create(batch)
+        stats["product_rows"] += len(batch)
+
+        daily = [
+            DailySales(
+                day=row["day"], status=row["rollup_status"],
+                orders=row["orders"], units=row["units"], revenue=row["revenue"],
+            )
+            for row in daily_rows
+        ]
+        DailySales.objects.bulk_create(daily, batch_size=batch_size)
+        stats["days"] = len(daily)
+
+    stats["elapsed"] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"Rebuilt sales rollups: {stats['days']} daily rows, {stats['product_rows']} product rows "
+        f"({stats['elapsed']}s)"
+    )
+    return stats
+
+
+def sales_summary(start, end, status='paid', product_id=None, limit=10):
+    """
+        Totals, a per-day series and the top products for [start, end], read from the
+        rollup tables only. With product_id the series is that product's.
+    """
+    if product_id is None:
+        days = DailySales.objects.filter(status=status, day__range=(start, end))
+    else:
+        days = ProductDailySales.objects.filter(product_id=product_id, status=status, day__range=(start, end))
+    series = list(days.order_by('day').values('day', 'orders', 'units', 'revenue'))
+
+    top_products = list(
+        ProductDailySales.objects.filter(status=status, day__range=(start, end))
+        .values('product_id', name=F('product__name'))
+        .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')[:limit]
+    )
+    for row in top_products:
+        # SQLite hands back aggregated decimals unquantized.
+        row['revenue'] = Decimal(row['revenue']).quantize(CENTS)
+
+    totals = {
+        'orders': sum(row['orders'] for row in series),
+        'units': sum(row['units'] for row in series),
+        'revenue': sum((row['revenue'] for row in series), start=0),
+    }
+    return {
+        'start': start,
+        'end': end,
+        'status': status,
+        'product_id': product_id,
+        'totals': totals,
+        'days': series,
+        'top_products': top_products,
+    }
@@ -1,22 +1,69 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
-from .models import Order, OrderItem
+from .export import EXPORT_FORMATS
+from .rollups import ROLLUP_STATUSES
 import datetime
-from carts.serializers import CartItemSerializer
+from django.utils import timezone
+from products.models import Product
+
+
+class OrderItemProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name']
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = OrderItemProductSerializer(read_only=True)
+
     class Meta:
         model = OrderItem
-        fields = '__all__'
+        fields = ['id', 'product', 'quantity', 'price']
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
+    # Prefetch 'orderitem_set' with its products (see orders.views.ORDER_ITEMS) to keep
+    # serializing a page of orders at a fixed number of queries.
+    items = OrderItemSerializer(many=True, read_only=True, source='orderitem_set')
 
     class Meta:
         model = Order
         fields = '__all__'
 
+
+class OrderHistoryFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order._meta.get_field('status').choices, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=ROLLUP_STATUSES, default='paid')
+    product_id = serializers.IntegerField(required=False, min_value=1)
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - datetime.timedelta(days=29))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
+
+
+class OrderExportQuerySerializer(serializers.Serializer):
+    # Not "format": DRF reserves that query parameter for renderer selection.
+    file_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default='csv')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Order._meta.get_field('status').choices, required=False)
+    gzip = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
+
         
 def check_expiry_month(value):
     if not 1 <= int(value) <= 12:
@@ -1,3 +1,169 @@
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+# Local imports goes here!
+from products.models import Product
+from users.models import User
+from . import payments
+from .brevo_stub import start_brevo_stub
+from .models import Order, OrderItem, OutboxMessage
+from .outbox import drain_outbox, enqueue_order_confirmation_email
+
+
+class DrainOutboxTests(TestCase):
+    """ drain_outbox() against the local Brevo stand-in (orders.brevo_stub). """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.brevo = start_brevo_stub()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.brevo.shutdown()
+        cls.brevo.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.brevo.messages.clear()
+        self.brevo.scripted.clear()
+        overrides = override_settings(
+            BREVO_API_URL=self.brevo.url, BREVO_API_KEY="test-key", SENDER_EMAIL="shop@example.com",
+            OUTBOX_MAX_ATTEMPTS=3,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        user = User.objects.create_user("buyer@example.com", "pw", first_name="Buyer")
+        product = Product.objects.create(user=user, name="Mug", description="d", price=10, stock=5)
+        self.order = Order.objects.create(user=user, total_amount=20, status="paid")
+        OrderItem.objects.create(order=self.order, product=product, quantity=2, price=10)
+        self.message = enqueue_order_confirmation_email(self.order, user.email)
+
+    def make_due(self):
+        """ Skip the backoff so the next drain retries right away. """
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_pending_message(self):
+        stats = drain_outbox(concurrency=2)
+
+        self.assertEqual(stats["sent"], 1)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "sent")
+        self.assertEqual(self.message.attempts, 1)
+        self.assertIsNotNone(self.message.sent_at)
+        self.assertEqual(len(self.brevo.messages), 1)
+        email = self.brevo.messages[0]
+        self.assertEqual(email["to"], [{"email": "buyer@example.com"}])
+        self.assertIn("2x Mug", email["textContent"])
+
+    def test_sent_message_is_not_sent_again(self):
+        drain_outbox()
+        stats = drain_outbox()
+
+        self.assertEqual(stats["sent"], 0)
+        self.assertEqual(len(self.brevo.messages), 1)
+
+    def test_retries_after_rate_limit_and_server_error(self):
+        self.brevo.fail_next(429, 503)
+
+        stats = drain_outbox()
+        self.assertEqual((stats["sent"], stats["retried"]), (0, 1))
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "pending")
+        self.assertEqual(self.message.attempts, 1)
+        self.assertIn("HTTP 429", self.message.last_error)
+        self.assertGreater(self.message.next_attempt_at, timezone.now())
+
+        # Backing off: not due yet, so nothing is sent.
+        self.assertEqual(drain_outbox()["retried"], 0)
+
+        self.make_due()
+        self.assertEqual(drain_outbox()["retried"], 1)
+        self.message.refresh_from_db()
+        self.assertIn("HTTP 503", self.message.last_error)
+
+        self.make_due()
+        self.assertEqual(drain_outbox()["sent"], 1)
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "sent")
+        self.assertEqual(self.message.attempts, 3)
+        self.assertEqual(self.message.last_error, "")
+        self.assertEqual(len(self.brevo.messages), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        self.brevo.fail_next(503, 503, 503)
+
+        for _ in range(3):
+            self.make_due()
+            drain_outbox()
+
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "failed")
+        self.assertEqual(self.message.attempts, 3)
+        self.assertEqual(self.brevo.messages, [])
+
+    def test_client_error_fails_without_retry(self):
+        self.brevo.fail_next(400)
+
+        stats = drain_outbox()
+
+        self.assertEqual((stats["failed"], stats["retried"]), (1, 0))
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, "failed")
+        self.assertEqual(self.message.attempts, 1)
+        self.assertIn("HTTP 400", self.message.last_error)
+
+
+class QueuePaymentTests(TransactionTestCase):
+    """ queue_payment() charging on the payment pool once the transaction commits. """
+
+    def setUp(self):
+        overrides = override_settings(
+            PAYMENT_GATEWAY="simulator", PAYMENT_SIMULATOR_LATENCY=0, PAYMENT_SIMULATOR_FAILURE_RATE=0,
+            PAYMENT_WORKERS=1,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Each test starts without a pool and gets its own one-worker pool on first use.
+        self.addCleanup(self.shut_down_pool)
+
+        user = User.objects.create_user("buyer@example.com", "pw", first_name="Buyer")
+        self.order = Order.objects.create(user=user, total_amount=20, status="pending")
+
+    def shut_down_pool(self):
+        if payments._executor is not None:
+            payments._executor.shutdown(wait=True)
+        payments._executor = None
+
+    def wait_for_pool(self):
+        """ With one worker, jobs run in order: once this no-op is done, so is the charge. """
+        payments.get_executor().submit(lambda: None).result(timeout=10)
+
+    def test_get_executor_is_shared(self):
+        self.assertIs(payments.get_executor(), payments.get_executor())
+
+    def test_charges_after_commit(self):
+        with transaction.atomic():
+            self.assertTrue(payments.start_payment(self.order))
+            payments.queue_payment(self.order)
+            # Nothing is submitted until the transaction commits.
+            self.assertIsNone(payments._executor)
+
+        self.wait_for_pool()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "paid")
+        self.assertTrue(self.order.payment_reference.startswith("sim_"))
+        self.assertEqual(OutboxMessage.objects.filter(status="pending").count(), 1)
+
+    def test_nothing_is_charged_on_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                payments.start_payment(self.order)
+                payments.queue_payment(self.order)
+                raise RuntimeError
+
+        self.assertIsNone(payments._executor)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
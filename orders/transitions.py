@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Local imports goes here!
+from .models import Order, OrderTransition
+from .rollups import ROLLUP_STATUSES, record_sale
+
+# The statuses each status may move to.
+TRANSITIONS = {
+    'pending': {'processing', 'cancelled'},
+    'processing': {'paid', 'failed'},
+    'failed': {'processing', 'cancelled'},
+    'paid': set(),
+    'cancelled': set(),
+}
+
+
+class InvalidTransition(Exception):
+    """ The order's status does not allow the requested transition. """
+
+
+class TransitionConflict(Exception):
+    """ The order changed since it was read; re-read it and decide again. """
+
+
+def can_transition(current, target):
+    return target in TRANSITIONS.get(current, ())
+
+
+def sources_of(target):
+    return [status for status, targets in TRANSITIONS.items() if target in targets]
+
+
+def record_creation(order, actor=None):
+    OrderTransition.objects.create(
+        order=order, from_status='', to_status=order.status, version=order.version,
+        actor=actor, created_at=order.created_at,
+    )
+
+
+def transition(order, target, actor=None, reason='', **fields):
+    """
+        Move `order` to `target` with one conditional UPDATE on (id, version, status) and
+        log it, in one transaction. No row lock is taken: a writer that read a stale version
+        gets TransitionConflict instead of overwriting the other writer's change.
+        Extra `fields` are written by the same UPDATE, and reaching paid or cancelled
+        updates the sales rollups in the same transaction. `order` is updated in place.
+    """
+    if not can_transition(order.status, target):
+        raise InvalidTransition(f"Order {order.pk} cannot go from {order.status} to {target}")
+
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(
+            pk=order.pk, version=order.version, status__in=sources_of(target)
+        ).update(status=target, version=F('version') + 1, updated_at=now, **fields)
+        if not updated:
+            raise TransitionConflict(f"Order {order.pk} changed since version {order.version}")
+        OrderTransition.objects.create(
+            order=order, from_status=order.status, to_status=target, version=order.version + 1,
+            actor=actor, reason=reason, created_at=now,
+        )
+        if target in ROLLUP_STATUSES:
+            record_sale(order.pk, target, now)
+
+    order.status, order.version, order.updated_at = target, order.version + 1, now
+    for name, value in fields.items():
+        setattr(order, name, value)
+    return order
@@ -1,38 +1,35 @@
-import requests
-import json
-
 from .models import OrderItem
 
 
-def send_order_confirmation_email(sender_email: str, receiver_email: str, brevo_api_key: str, order):
-    url = "https://api.brevo.com/v3/smtp/email"
-    order_items = OrderItem.objects.filter(order=order)
-    items_list = [f"{item.quantity}x {item.product.name}" for item in order_items]
+def order_confirmation_email(sender_email: str, receiver_email: str, order):
+    """ The Brevo request body confirming `order`, built with one joined query for its items. """
+    order_items = OrderItem.objects.filter(order=order).values_list("quantity", "product__name")
+    items_list = [f"{quantity}x {name}" for quantity, name in order_items]
     total_amount = order.total_amount
 
-    payload = json.dumps(
-        {
-            "sender": {"name": "appgain", "email": sender_email},
-            "to": [{"email": f"{receiver_email}"}],
-            "subject": f'Order Confirmation - #{order.id}',
-            "textContent": f"""
-                            Hi {order.user.first_name},This email confirms your successful payment for Order #{order.id}.
-                            Order details:
-                            - Items:
-                                {', '.join(items_list)}
-                            - Total Amount: {total_amount} EGP
-
-                            Thank you for your order!
-
-                            Sincerely,
-
-                            Mohamed Abdelhamid Store Team""",
-        }
-    )
-    headers = {
+    return {
+        "sender": {"name": "appgain", "email": sender_email},
+        "to": [{"email": f"{receiver_email}"}],
+        "subject": f'Order Confirmation - #{order.id}',
+        "textContent": f"""
+                        Hi {order.user.first_name},This email confirms your successful payment for Order #{order.id}.
+                        Order details:
+                        - Items:
+                            {', '.join(items_list)}
+                        - Total Amount: {total_amount} EGP
+
+                        Thank you for your order!
+
+                        Sincerely,
+
+                        Mohamed Abdelhamid Store Team""",
+    }
+
+
+def brevo_headers(brevo_api_key: str):
+    return {
         "accept": "application/json",
-        "api-key": brevo_api_key,
+        "api-key": brevo_api_key or "",
         "content-type": "application/json",
     }
-    response = requests.request("POST", url, headers=headers, data=payload)
-    print(response.text)
+
@@ -1,56 +1,89 @@
-from decimal import Decimal
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import DecimalField, F, Prefetch, Sum, prefetch_related_objects
+from rest_framework.exceptions import NotFound
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
-import stripe
 import os
 from dotenv import load_dotenv
 import logging
 
 # Local Import goes here!
 from .models import Order, OrderItem
-from .serializers import OrderSerializer
+from .serializers import OrderExportQuerySerializer, OrderHistoryFilterSerializer, OrderSerializer, SalesAnalyticsQuerySerializer
 from .models import Order
 from .serializers import CardInformationSerializer
 from .permissions import IsOwnerOrReadOnly
-from .utils import send_order_confirmation_email
+from .payments import PAID, UNKNOWN, charge_order, queue_payment, start_payment
+from .conditional import order_validators
+from .idempotency import idempotent
+from .rollups import sales_summary
+from .export import CONTENT_TYPES, async_blocks, export_file_name, export_orders
+from .transitions import InvalidTransition, TransitionConflict, record_creation, transition
+from carts.models import Cart, CartItem
+from carts.utils import invalidate_reserved_products, release_stock_lines
+from order_processing_system.conditional import conditional_view
+from order_processing_system.pagination import KeysetPagination
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Items of every order being serialized, with their products, in one joined query.
+ORDER_ITEMS = Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product').order_by('id'))
 
 
-SENDER_EMAIL=os.getenv("SENDER_EMAIL")
-BREVO_API_KEY=os.getenv("BREVO_API_KEY")
-STRIPE_SECRET_KEY=os.getenv("STRIPE_SECRET_KEY")
+class CartChanged(Exception):
+    """ The cart lines being checked out were changed or released concurrently. """
+
 
 class OrderCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'checkout'
 
+    @idempotent
     def post(self, request):
         try:
             user = request.user
-            cart = user.cart
-            total_amount = Decimal(0)
-            for item in cart.items.all():
-                total_amount += item.quantity * item.product.price
-
-            for item in cart.items.all():
-                if item.product.stock < item.quantity:
-                    error_msg = f"Insufficient stock for {item.product.name}"
-                    logger.error(error_msg)
-                    return Response({'error': f"Insufficient stock for {item.product.name}"}, status=status.HTTP_400_BAD_REQUEST)
-
-            order = Order.objects.create(
-                user=user, cart=cart, total_amount=total_amount, status='pending'
-            )
-
-            for item in cart.items.all():
-                OrderItem.objects.create(
-                    order=order, product=item.product, quantity=item.quantity, price=item.product.price
-                )
-            cart.items.all().delete()
+            cart_id = Cart.objects.filter(user=user).values_list('id', flat=True).first()
+            try:
+                with transaction.atomic():
+                    # One joined query for the lines and their products.
+                    items = list(
+                        CartItem.objects.select_for_update()
+                        .filter(cart_id=cart_id)
+                        .select_related('product')
+                        .only('id', 'quantity', 'product__id', 'product__price')
+                    )
+                    if not items:
+                        return Response({'error': 'Your cart is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+
+                    total_amount = CartItem.objects.filter(cart_id=cart_id).aggregate(
+                        total=Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=10, decimal_places=2))
+                    )['total']
+
+                    order = Order.objects.create(
+                        user=user, cart_id=cart_id, total_amount=total_amount, status='pending'
+                    )
+                    record_creation(order, actor=user)
+                    OrderItem.objects.bulk_create([
+                        OrderItem(order=order, product_id=item.product_id, quantity=item.quantity, price=item.product.price)
+                        for item in items
+                    ])
+
+                    # The stock for these lines was reserved when they were added to the cart;
+                    # checkout claims the lines instead of taking stock again. If an expiry sweep
+                    # or another checkout got to any of them first, nothing is kept.
+                    claimed, _ = CartItem.objects.filter(id__in=[item.id for item in items]).delete()
+                    if claimed != len(items):
+                        raise CartChanged()
+            except CartChanged:
+                logger.warning(f'Cart {cart_id} changed during checkout')
+                return Response({'error': 'Your cart changed during checkout, please try again.'}, status=status.HTTP_409_CONFLICT)
+
+            prefetch_related_objects([order], ORDER_ITEMS)
             serializer = OrderSerializer(order)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -66,26 +99,36 @@ class OrderCancelView(APIView):
 
     def post(self, request, pk):
         try:
-            order = Order.objects.get(pk=pk, user=request.user)
-            order_items = order.orderitem_set.all()
-            if order.status == 'cancelled':
-                logger.warning(f'Tried to cancel already cancelled order: {order.id}')
-                return Response({'error': 'This order has already been canceled'}, status=status.HTTP_400_BAD_REQUEST)
-
-            if order.status == 'paid':
-                logger.error(f'Attempted to cancel paid order: {order.id}')
-                return Response({'error': 'Order cannot be cancelled'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update order status and loop through order items
-            order.status = 'cancelled'
-            for item in order_items:
-                product = item.product
-                product.stock += item.quantity
-                product.save()
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(pk=pk, user=request.user)
+                if order.status == 'cancelled':
+                    logger.warning(f'Tried to cancel already cancelled order: {order.id}')
+                    return Response({'error': 'This order has already been canceled'}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Conditional on the version just read, so a payment that slipped in
+                # between wins and the stock is not given back twice.
+                try:
+                    transition(order, 'cancelled', actor=request.user)
+                except InvalidTransition:
+                    logger.error(f'Attempted to cancel {order.status} order: {order.id}')
+                    return Response({'error': 'Order cannot be cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+                except TransitionConflict:
+                    logger.warning(f'Order {order.id} changed while being cancelled')
+                    return Response({'error': 'This order changed while being cancelled, please try again.'}, status=status.HTTP_409_CONFLICT)
+
+                # One grouped read of the quantities and one UPDATE statement for the stock.
+                quantities = dict(
+                    OrderItem.objects.filter(order=order)
+                    .values_list('product_id')
+                    .annotate(quantity=Sum('quantity'))
+                    .order_by()
+                )
+                release_stock_lines(quantities)
+                invalidate_reserved_products(quantities)
 
-            order.save()
             logger.info(f'Order cancelled successfully: {order.id}')
 
+            prefetch_related_objects([order], ORDER_ITEMS)
             serializer = OrderSerializer(order)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Order.DoesNotExist:
@@ -95,9 +138,10 @@ class OrderCancelView(APIView):
 class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_view(order_validators)
     def get(self, request, pk):
         try:
-            order = Order.objects.get(pk=pk)
+            order = Order.objects.prefetch_related(ORDER_ITEMS).get(pk=pk)
             self.check_object_permissions(request, order)  # Optional permission check
             serializer = OrderSerializer(order)
             return Response(serializer.data)
@@ -116,15 +160,36 @@ class UserOrderListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user)
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        filters = OrderHistoryFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Served by the (user, created_at) index; the items of the whole page come in one query.
+        orders = Order.objects.filter(user=request.user).prefetch_related(ORDER_ITEMS)
+        if 'status' in filters.validated_data:
+            orders = orders.filter(status=filters.validated_data['status'])
+        if 'created_after' in filters.validated_data:
+            orders = orders.filter(created_at__gte=filters.validated_data['created_after'])
+        if 'created_before' in filters.validated_data:
+            orders = orders.filter(created_at__lt=filters.validated_data['created_before'])
+
+        paginator = KeysetPagination()
+        try:
+            page = paginator.paginate_queryset(orders, request, view=self)
+        except NotFound as e:
+            logger.warning(f'Invalid cursor while retrieving orders: {request.query_params.get("cursor")}')
+            return Response({'error': e.detail}, status=status.HTTP_404_NOT_FOUND)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class PaymentView(APIView):
+    throttle_scope = 'payment'
+
+    @idempotent
     def post(self, request, pk):
         try:
-            order = Order.objects.get(pk=pk, user=request.user)
+            order = Order.objects.select_related('user').get(pk=pk, user=request.user)
             if order.status == 'paid':
                 logger.warning(f'Attempted to pay for already paid order: {order.id}')
                 return Response({'message': 'Order is already paid'}, status=status.HTTP_400_BAD_REQUEST)
@@ -134,27 +199,36 @@ class PaymentView(APIView):
             if not serializer.is_valid():
                 logger.error(f'Invalid card information submitted for order: {order.id}')
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
-            stripe.api_key = STRIPE_SECRET_KEY
 
-            # Create a payment intent with test data
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(order.total_amount * 100),
-                currency='usd',
-                payment_method_types=['card'],
-            )
+            if not start_payment(order, actor=request.user):
+                logger.warning(f'Payment already in progress or not allowed for order: {order.id}')
+                return Response({'error': 'This order is already being paid or cannot be paid'}, status=status.HTTP_409_CONFLICT)
 
-            # Simulate successful payment just to make things simple 
-            # but before mark status as paid i should validate the client side
-            order.status = 'paid'
-            order.save()
+            if settings.PAYMENT_ASYNC:
+                # The charge runs on the payment pool; clients poll the order for the outcome.
+                queue_payment(order)
+                response = {
+                    'message': "Payment is being processed",
+                    'status': order.status,
+                }
+                return Response(response, status=status.HTTP_202_ACCEPTED)
 
             try:
-                send_order_confirmation_email(SENDER_EMAIL, order.user.email, BREVO_API_KEY, order)
+                outcome = charge_order(order)
             except Exception as e:
-                logger.error(f"Error sending confirmation email for order {order.id}: {e}")
+                # The order is processing by now; reconcile_payments settles the attempt.
+                logger.error(f'Error charging order {order.id}: {str(e)}')
+                outcome = UNKNOWN
+            if outcome == UNKNOWN:
+                # The order stays processing until the same attempt is confirmed or failed.
+                response = {
+                    'message': "Payment is being confirmed",
+                    'status': order.status,
+                }
+                return Response(response, status=status.HTTP_202_ACCEPTED)
+            if outcome != PAID:
+                return Response({'error': 'Card Payment Failed'}, status=status.HTTP_402_PAYMENT_REQUIRED)
 
-            logger.info(f'Successful payment for order: {order.id}')
             response = {
                 'message': "Card Payment Success",
                 'status': status.HTTP_200_OK,
@@ -166,3 +240,49 @@ class PaymentView(APIView):
         except Exception as e:
             logger.error(f'Internal server error: {str(e)}')
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SalesAnalyticsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        query = SalesAnalyticsQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Reads the sales rollup tables only, never orders or their items.
+            return Response(sales_summary(**query.validated_data), status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f'Error occurred while retrieving sales analytics: {str(e)}')
+            return Response({'error': 'Internal Server Error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class OrderExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        query = OrderExportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = query.validated_data
+        export_format, compress = options['file_format'], options['gzip']
+
+        # Rows are read, formatted and (optionally) compressed while the response is sent.
+        blocks = export_orders(
+            export_format=export_format,
+            start=options.get('start'),
+            end=options.get('end'),
+            status=options.get('status'),
+            compress=compress,
+        )
+        # WSGI servers put wsgi.version in the environ; an ASGI request has none.
+        if 'wsgi.version' not in request.META:
+            blocks = async_blocks(blocks)
+        response = StreamingHttpResponse(
+            blocks,
+            content_type='application/gzip' if compress else CONTENT_TYPES[export_format],
+        )
+        file_name = export_file_name(export_format, options.get('start'), options.get('end'), compress)
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        logger.info(f'Order export started by {request.user.id}: {file_name}')
+        return response
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Product, ProductImage
+from .models import Product, ProductImage, ProductImageFile
 # Register your models here.
 admin.site.register(Product)
-admin.site.register(ProductImage)
\ No newline at end of file
+admin.site.register(ProductImage)
+admin.site.register(ProductImageFile)
@@ -0,0 +1,142 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Local imports goes here!
+from .models import Product
+from .serializers import ProductRetrieveUpdateDestroySerializer
+
+PRODUCT_VERSION_KEY = "products:version:{pk}"
+PRODUCT_DATA_KEY = "products:detail:{pk}:{version}"
+PRODUCT_LIST_GENERATION_KEY = "products:list:generation"
+PRODUCT_LIST_PAGE_KEY = "products:list:{generation}:{digest}"
+CACHE_HITS_KEY = "products:stats:hits"
+CACHE_MISSES_KEY = "products:stats:misses"
+
+
+def _timeout():
+    return getattr(settings, "PRODUCT_CACHE_TIMEOUT", 300)
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key was evicted between add() and incr().
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def record_hit():
+    _incr(CACHE_HITS_KEY)
+
+
+def record_miss():
+    _incr(CACHE_MISSES_KEY)
+
+
+def get_cache_stats():
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+async def aget_product_data(pk):
+    """
+        Read-through lookup of a product representation; a miss is read with the async ORM.
+        The entry is keyed on (id, updated_at); a small version pointer maps the id to
+        the current updated_at so a hit does not touch the database at all.
+        Raises Product.DoesNotExist like Product.objects.aget().
+    """
+    data = _cached_product_data(pk)
+    if data is None:
+        data = _cache_product_data(await Product.objects.select_related("user").aget(pk=pk))
+    return data
+
+
+def _cached_product_data(pk):
+    version = cache.get(PRODUCT_VERSION_KEY.format(pk=pk))
+    if version is not None:
+        data = cache.get(PRODUCT_DATA_KEY.format(pk=pk, version=version))
+        if data is not None:
+            record_hit()
+            return data
+    record_miss()
+    return None
+
+
+def _cache_product_data(product):
+    data = dict(ProductRetrieveUpdateDestroySerializer(product).data)
+    version = product.updated_at.isoformat()
+    cache.set_many(
+        {
+            PRODUCT_VERSION_KEY.format(pk=product.pk): version,
+            PRODUCT_DATA_KEY.format(pk=product.pk, version=version): data,
+        },
+        timeout=_timeout(),
+    )
+    return data
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
+
+def get_product_list_generation():
+    """ Token naming the current state of the catalog; it changes on every product write. """
+    generation = cache.get(PRODUCT_LIST_GENERATION_KEY)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(PRODUCT_LIST_GENERATION_KEY, generation, timeout=None):
+            # Another worker started a generation first; use theirs.
+            generation = cache.get(PRODUCT_LIST_GENERATION_KEY, generation)
+    return generation
+
+
+def _list_page_key(request):
+    generation = get_product_list_generation()
+    digest = hashlib.md5(request.build_absolute_uri().encode("utf-8")).hexdigest()
+    return PRODUCT_LIST_PAGE_KEY.format(generation=generation, digest=digest)
+
+
+def get_product_list_page(request):
+    data = cache.get(_list_page_key(request))
+    if data is None:
+        record_miss()
+    else:
+        record_hit()
+    return data
+
+
+def set_product_list_page(request, data):
+    cache.set(_list_page_key(request), data, timeout=_timeout())
+
+
+def invalidate_product(pk):
+    """
+        Drop the cached representation of one product and every cached catalog page.
+        Call this after queryset.update() on products, since it does not send signals.
+    """
+    cache.delete(PRODUCT_VERSION_KEY.format(pk=pk))
+    invalidate_product_list()
+
+
+def invalidate_products(pks):
+    """ invalidate_product() for many products, with a single catalog invalidation. """
+    cache.delete_many([PRODUCT_VERSION_KEY.format(pk=pk) for pk in pks])
+    invalidate_product_list()
+
+
+def invalidate_product_list():
+    # A new generation orphans every cached page at once; they expire on their own. It is a
+    # fresh token rather than an increment: incr() is a read then a write on the file based
+    # cache, so two workers invalidating together could store the same next number.
+    cache.set(PRODUCT_LIST_GENERATION_KEY, _new_generation(), timeout=None)
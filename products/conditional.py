@@ -0,0 +1,31 @@
+from django.db.models import Count, Max
+
+# Local imports goes here!
+from .cache import get_product_list_generation
+from .models import Product
+
+
+def product_validators(request, pk):
+    updated_at = Product.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None
+    return updated_at, pk
+
+
+def product_list_validators(request, *args, **kwargs):
+    # The page cache's generation changes on every product write, so it identifies the
+    # catalog's state without a query: no Last-Modified, the ETag alone validates.
+    return None, get_product_list_generation()
+
+
+def product_images_validators(request, product_id):
+    row = (
+        Product.objects.filter(pk=product_id)
+        .annotate(last_modified=Max("images__updated_at"), count=Count("images"))
+        .values_list("last_modified", "count")
+        .first()
+    )
+    if row is None:
+        return None
+    last_modified, count = row
+    return last_modified, count
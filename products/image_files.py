@@ -0,0 +1,64 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+# Local imports goes here!
+from .imaging import variant_names
+from .models import ProductImage, ProductImageFile
+
+
+def _group_by_count(counts):
+    """ {digest: n} -> {n: [digest, ...]} so each distinct n costs one UPDATE. """
+    groups = defaultdict(list)
+    for digest, count in counts.items():
+        groups[count].append(digest)
+    return groups
+
+
+def acquire_image_files(images):
+    """ Add one reference per image to the files they point at. """
+    images = [image for image in images if image.sha256]
+    if not images:
+        return
+    counts = Counter(image.sha256 for image in images)
+    names = {image.sha256: image.image.name for image in images}
+    with transaction.atomic():
+        ProductImageFile.objects.bulk_create(
+            [ProductImageFile(sha256=digest, name=names[digest]) for digest in counts],
+            ignore_conflicts=True,
+        )
+        for count, digests in _group_by_count(counts).items():
+            ProductImageFile.objects.filter(sha256__in=digests).update(
+                ref_count=F("ref_count") + count
+            )
+
+
+def release_image_files(digests):
+    """
+        Drop one reference per digest. Files nobody references any more are deleted,
+        together with their variants, once the transaction commits.
+    """
+    counts = Counter(digest for digest in digests if digest)
+    if not counts:
+        return
+    with transaction.atomic():
+        for count, group in _group_by_count(counts).items():
+            ProductImageFile.objects.filter(sha256__in=group, ref_count__gte=count).update(
+                ref_count=F("ref_count") - count
+            )
+        orphans = list(ProductImageFile.objects.filter(sha256__in=counts, ref_count=0))
+        if not orphans:
+            return
+        ProductImageFile.objects.filter(id__in=[orphan.id for orphan in orphans]).delete()
+
+    storage = ProductImage._meta.get_field("image").storage
+
+    def delete_files():
+        for orphan in orphans:
+            for files in variant_names(orphan.name, settings.PRODUCT_IMAGE_VARIANT_SIZES).values():
+                for name in files.values():
+                    storage.delete(name)
+
+    transaction.on_commit(delete_files)
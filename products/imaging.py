@@ -0,0 +1,55 @@
+"""
+    Pillow work for product image variants.
+    This module must not import Django: it is loaded on its own by the worker processes.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def _save(image, path, image_format, quality):
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(path, format=image_format, quality=quality, optimize=True)
+
+
+def variant_names(name, sizes):
+    """ Storage names of every variant derived from `name`, by variant and kind. """
+    root, ext = os.path.splitext(name)
+    names = {
+        variant: {"original": f"{root}_{variant}{ext}", "webp": f"{root}_{variant}.webp"}
+        for variant in sizes
+    }
+    names["full"] = {"original": name, "webp": f"{root}.webp"}
+    return names
+
+
+def generate_variants(media_root, name, sizes, quality=80):
+    """
+        Write resized copies of the image stored at `name` next to the original.
+
+        For every configured size there is one file in the original format and one WebP
+        file; a full-size WebP copy is added under "full". Returns the storage names,
+        e.g. {"thumbnail": {"original": "...", "webp": "..."}, ...}.
+    """
+    source_path = os.path.join(media_root, name)
+    variants = variant_names(name, sizes)
+
+    with Image.open(source_path) as source:
+        image_format = source.format or "JPEG"
+        # Apply the EXIF orientation once so every variant is upright.
+        original = ImageOps.exif_transpose(source)
+        original.load()
+
+    for variant, (width, height) in sizes.items():
+        resized = original.copy()
+        resized.thumbnail((width, height), Image.LANCZOS)
+
+        names = variants[variant]
+        _save(resized, os.path.join(media_root, names["original"]), image_format, quality)
+        _save(resized, os.path.join(media_root, names["webp"]), "WEBP", quality)
+
+    full_webp_name = variants["full"]["webp"]
+    if full_webp_name != name:
+        _save(original, os.path.join(media_root, full_webp_name), "WEBP", quality)
+    return variants
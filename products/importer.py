@@ -0,0 +1,180 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+# Local imports goes here!
+from .cache import invalidate_products
+from .models import Product
+
+IMPORT_FORMATS = ("csv", "ndjson")
+UPSERT_FIELDS = ("description", "price", "stock", "updated_at")
+
+
+class ProductImportRowSerializer(serializers.ModelSerializer):
+    """ Field validation only; name uniqueness is checked per chunk by the importer. """
+    class Meta:
+        model = Product
+        fields = ["name", "description", "price", "stock"]
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self, max_errors=None):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": len(self.errors),
+            "errors": [
+                {"line": line, "errors": errors} for line, errors in self.errors[:max_errors]
+            ],
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def guess_format(file_name):
+    return "ndjson" if file_name.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def read_rows(stream, import_format):
+    """
+        Yield (line number, row) from a text stream without reading it all in.
+        Unparseable NDJSON lines are yielded as their exception and reported as row errors.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _update_products(products):
+    """
+        Write the upserted columns with one prepared UPDATE run through executemany().
+        bulk_update() would build a CASE expression per column and row, which costs far
+        more Python time than the database spends on the rows.
+    """
+    fields = [Product._meta.get_field(name) for name in UPSERT_FIELDS]
+    quote = connection.ops.quote_name
+    sql = "UPDATE {table} SET {assignments} WHERE {pk} = %s".format(
+        table=quote(Product._meta.db_table),
+        assignments=", ".join(f"{quote(f.column)} = %s" for f in fields),
+        pk=quote(Product._meta.pk.column),
+    )
+    params = [
+        [f.get_db_prep_save(getattr(product, f.attname), connection) for f in fields] + [product.pk]
+        for product in products
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _import_chunk(chunk, user, upsert, result, row_serializer):
+    valid = {}
+    for line_number, row in chunk:
+        result.rows += 1
+        if not isinstance(row, dict):
+            result.errors.append((line_number, {"row": [f"Invalid row: {row}"]}))
+            continue
+        try:
+            data = row_serializer.run_validation(row)
+        except serializers.ValidationError as e:
+            result.errors.append((line_number, e.detail))
+            continue
+        if data["name"] in valid and not upsert:
+            result.errors.append((line_number, {"name": ["Duplicate name in this import."]}))
+            continue
+        # With upsert a repeated name simply overwrites the earlier row.
+        valid[data["name"]] = (line_number, data)
+
+    if not valid:
+        return
+
+    # One query per chunk replaces the per-row validate_name() existence check.
+    existing = {
+        product.name: product
+        for product in Product.objects.filter(user=user, name__in=list(valid))
+    }
+
+    to_create, to_update = [], []
+    now = timezone.now()
+    for name, (line_number, data) in valid.items():
+        product = existing.get(name)
+        if product is None:
+            to_create.append(Product(user=user, **data))
+        elif upsert:
+            for attr, value in data.items():
+                setattr(product, attr, value)
+            product.updated_at = now
+            to_update.append(product)
+        else:
+            result.errors.append(
+                (line_number, {"name": ["You already have a product with this name."]})
+            )
+
+    with transaction.atomic():
+        Product.objects.bulk_create(to_create)
+        if to_update:
+            _update_products(to_update)
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+    # Bulk writes send no signals; keep the product cache honest by hand.
+    if to_create or to_update:
+        invalidate_products([product.pk for product in to_update])
+
+
+def import_products(rows, user, batch_size=1000, upsert=False, progress=None):
+    """
+        Create (or with upsert, update by (user, name)) products from (line, row) pairs.
+        Rows are consumed chunk by chunk, so memory depends on batch_size only.
+        Each chunk is written in its own transaction; progress(result) runs after each.
+    """
+    result = ImportResult()
+    # One serializer for the whole run: its fields are built once, not once per row.
+    row_serializer = ProductImportRowSerializer()
+    started = time.monotonic()
+    for chunk in chunked(rows, batch_size):
+        _import_chunk(chunk, user, upsert, result, row_serializer)
+        result.elapsed = time.monotonic() - started
+        if progress is not None:
+            progress(result)
+    result.elapsed = time.monotonic() - started
+    return result
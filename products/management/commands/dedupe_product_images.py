@@ -0,0 +1,73 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+# Local imports goes here!
+from products.image_files import acquire_image_files
+from products.models import ProductImage
+from products.utils import product_image_directory_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Move product images stored before content addressing to hash-based paths, "
+        "keeping a single copy of identical files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Images read from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        storage = ProductImage._meta.get_field("image").storage
+        images = (
+            ProductImage.objects.filter(sha256="")
+            .exclude(image="")
+            .exclude(image__isnull=True)
+            .order_by("id")
+        )
+
+        converted = failed = reclaimed = 0
+        last_id = 0
+        while True:
+            batch = list(images.filter(id__gt=last_id)[:options["batch_size"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for image in batch:
+                old_name = image.image.name
+                old_files = {old_name}
+                for files in (image.variants or {}).values():
+                    old_files.update(files.values())
+                try:
+                    with image.image.open("rb") as source:
+                        new_name = product_image_directory_path(image, os.path.basename(old_name))
+                        storage.save(new_name, File(source))
+                except (OSError, ValueError) as e:
+                    failed += 1
+                    self.stderr.write(f"Image {image.pk} ({old_name}): {e}")
+                    continue
+
+                ProductImage.objects.filter(pk=image.pk).update(
+                    image=new_name, sha256=image.sha256, variants={}
+                )
+                image.image.name = new_name
+                acquire_image_files([image])
+                converted += 1
+
+                if not ProductImage.objects.filter(image=old_name).exists():
+                    for name in old_files - {new_name}:
+                        if storage.exists(name):
+                            reclaimed += storage.size(name)
+                            storage.delete(name)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Converted {converted} images ({failed} failed), removed {reclaimed} bytes of legacy files. "
+                "Run generate_product_image_variants to rebuild their variants."
+            )
+        )
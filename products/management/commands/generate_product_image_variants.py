@@ -0,0 +1,74 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Local imports goes here!
+from products.imaging import generate_variants
+from products.models import ProductImage
+from products.variants import variant_args, store_variants
+
+
+class Command(BaseCommand):
+    help = "Generate resized and WebP variants for existing product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Regenerate variants for images that already have them.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.PRODUCT_IMAGE_WORKERS or 1,
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Images read from the database and submitted to the pool at a time.",
+        )
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["force"]:
+            images = images.filter(variants={})
+        images = images.order_by("id").only("id", "image")
+
+        started = time.monotonic()
+        done = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=max(options["workers"], 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            # Walk the table by id instead of holding a cursor open while we write to it.
+            last_id = 0
+            while True:
+                batch = list(images.filter(id__gt=last_id)[:options["batch_size"]])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                ok, errors = self._process(executor, batch)
+                done, failed = done + ok, failed + errors
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated variants for {done} images ({failed} failed) in {elapsed:.2f}s."
+            )
+        )
+
+    def _process(self, executor, images):
+        futures = {
+            executor.submit(generate_variants, *variant_args(image)): image
+            for image in images
+        }
+        done = failed = 0
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                store_variants(image.pk, future.result())
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Image {image.pk} ({image.image.name}): {e}")
+        return done, failed
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+# Local imports goes here!
+from products.importer import IMPORT_FORMATS, guess_format, import_products, read_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream products from a CSV or NDJSON file into the catalog in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (name,description,price,stock) or NDJSON file.")
+        parser.add_argument("--user", required=True, help="Email of the owning user.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--upsert", action="store_true",
+            help="Update products that already exist for the user by name instead of rejecting them.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        import_format = options["format"] or guess_format(options["path"])
+        reported_errors = 0
+
+        def progress(result):
+            nonlocal reported_errors
+            for line, errors in result.errors[reported_errors:]:
+                self.stderr.write(f"Line {line}: {errors}")
+            reported_errors = len(result.errors)
+            self.stdout.write(
+                f"{result.rows} rows, {result.created} created, {result.updated} updated, "
+                f"{len(result.errors)} failed ({result.rows_per_second:.0f} rows/s)"
+            )
+
+        try:
+            with open(options["path"], encoding="utf-8", newline="") as stream:
+                result = import_products(
+                    read_rows(stream, import_format),
+                    user,
+                    batch_size=options["batch_size"],
+                    upsert=options["upsert"],
+                    progress=progress,
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.rows} rows in {result.elapsed:.2f}s "
+                f"({result.rows_per_second:.0f} rows/s): {result.created} created, "
+                f"{result.updated} updated, {len(result.errors)} failed."
+            )
+        )
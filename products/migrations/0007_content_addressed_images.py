@@ -0,0 +1,35 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:28
+
+from django.db import migrations, models
+import products.storage
+import products.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImageFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.ContentAddressedStorage(), upload_to=products.utils.product_image_directory_path),
+        ),
+    ]
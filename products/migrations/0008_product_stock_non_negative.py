@@ -0,0 +1,33 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:33
+
+import importlib
+
+from django.db import migrations, models
+
+search_index = importlib.import_module('products.migrations.0004_product_search_index')
+
+
+def recreate_search_triggers(apps, schema_editor):
+    # SQLite adds a CHECK constraint by rebuilding the table, which drops its triggers.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in search_index.DROP_SEARCH_INDEX[:3]:
+        schema_editor.execute(statement)
+    for statement in search_index.CREATE_SEARCH_INDEX[1:4]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_triggers),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('stock__gte', 0)), name='product_stock_non_negative'),
+        ),
+        migrations.RunPython(recreate_search_triggers, migrations.RunPython.noop),
+    ]
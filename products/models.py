@@ -1,9 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 
 # Local imports goes here!
 from .utils import product_image_directory_path
+from .storage import ContentAddressedStorage
 User = get_user_model()
 
 
@@ -16,6 +18,15 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_at_id_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_at_idx'),
+        ]
+        constraints = [
+            # Backs the conditional stock updates: a reservation can never oversell.
+            models.CheckConstraint(check=models.Q(stock__gte=0), name='product_stock_non_negative'),
+        ]
 
     def __str__(self):
         return self.name
@@ -25,20 +36,46 @@ class Product(models.Model):
         return self.stock > 0
 
     def decrease_stock(self, quantity):
-        if self.stock >= quantity:
-            self.stock -= quantity
-            self.save()
-            return True
-        return False
+        # Conditional UPDATE instead of read-modify-write, so concurrent callers can't oversell.
+        updated = Product.objects.filter(pk=self.pk, stock__gte=quantity).update(
+            stock=models.F('stock') - quantity, updated_at=timezone.now()
+        )
+        if updated:
+            self.refresh_from_db(fields=['stock', 'updated_at'])
+        return bool(updated)
 
     def increase_stock(self, quantity):
-        self.stock += quantity
-        self.save()
+        Product.objects.filter(pk=self.pk).update(
+            stock=models.F('stock') + quantity, updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['stock', 'updated_at'])
 
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to=product_image_directory_path, null=True, blank=True)
+    image = models.ImageField(
+        upload_to=product_image_directory_path,
+        storage=ContentAddressedStorage(),
+        null=True,
+        blank=True,
+    )
+    # Storage names of the generated resized / WebP copies, see products.variants.
+    variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # SHA-256 of the image bytes, set by product_image_directory_path. Empty for images
+    # stored before content addressing; run dedupe_product_images to convert those.
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
 
     def __str__(self):
         return self.product.name
+
+
+class ProductImageFile(models.Model):
+    """ Reference count of a content-addressed image file shared by product images. """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
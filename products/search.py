@@ -0,0 +1,55 @@
+from django.db import connection
+from django.db.models import Q
+
+# Local imports goes here!
+from .models import Product
+
+SEARCH_INDEX_TABLE = "products_product_fts"
+
+
+def build_match_query(query):
+    """
+        Turn free user input into a safe FTS5 MATCH expression.
+        Every term is quoted (so operators and stray quotes can't break the syntax)
+        and prefix-matched, and all terms must match.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+def search_product_ids(query, limit, offset=0):
+    """ Return product ids matching the query, best bm25 rank first. """
+    match_query = build_match_query(query)
+    if not match_query:
+        return []
+
+    if connection.vendor != "sqlite":
+        # No FTS5 index outside SQLite; fall back to a plain scan.
+        products = Product.objects.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        ).order_by("-created_at", "-id")
+        return list(products.values_list("id", flat=True)[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_INDEX_TABLE} "
+            f"WHERE {SEARCH_INDEX_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s",
+            [match_query, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_products(query, limit, offset=0):
+    """ Ranked products for the query, with their owners joined in one extra query. """
+    ids = search_product_ids(query, limit, offset)
+    products = Product.objects.select_related("user").in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+def rebuild_search_index():
+    """ Re-read every product into the index in one bulk pass. """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_INDEX_TABLE}({SEARCH_INDEX_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {SEARCH_INDEX_TABLE}({SEARCH_INDEX_TABLE}) VALUES ('optimize')")
@@ -51,7 +51,20 @@ class ProductRetrieveUpdateDestroySerializer(serializers.ModelSerializer):
         }
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
         fields = "__all__"
 
+    def get_variants(self, obj):
+        storage = obj.image.storage
+        return {
+            variant: {kind: storage.url(name) for kind, name in files.items()}
+            for variant, files in obj.variants.items()
+        }
+
+
+class ProductImageUploadSerializer(serializers.Serializer):
+    """ Validates uploaded files only; the product is known from the URL. """
+    image = serializers.ImageField()
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+# Local imports goes here!
+from .cache import invalidate_product
+from .image_files import acquire_image_files, release_image_files
+from .models import Product, ProductImage
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_product(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    invalidate_product(instance.product_id)
+
+
+@receiver(pre_save, sender=ProductImage)
+def remember_product_image_file(sender, instance, **kwargs):
+    # Still the stored value here: the new hash is only set when the file is saved.
+    instance._previous_sha256 = instance.sha256
+
+
+@receiver(post_save, sender=ProductImage)
+def count_product_image_file(sender, instance, created, **kwargs):
+    previous = "" if created else getattr(instance, "_previous_sha256", "")
+    if instance.sha256 != previous:
+        acquire_image_files([instance])
+        release_image_files([previous])
+
+
+@receiver(post_delete, sender=ProductImage)
+def release_product_image_file(sender, instance, **kwargs):
+    release_image_files([instance.sha256])
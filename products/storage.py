@@ -0,0 +1,26 @@
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+        File system storage for names derived from the file's own bytes.
+        Saving a name that already exists keeps the stored file instead of writing a
+        renamed copy, since the same name always means the same content.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name and move it into place, so two uploads of
+        # the same bytes racing each other can't collide or leave a partial file behind.
+        temporary_name = super()._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temporary_name), self.path(name))
+        return name
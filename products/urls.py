@@ -2,12 +2,16 @@ from django.urls import path
 
 from .views import (ProductRetrieveUpdateDestroyView, ProductListCreateView,
                     ProductImageListCreateView, ProductImageRetrieveUpdateDestroyView,
-                    ProductImagesDeleteAllImagesView)
+                    ProductImagesDeleteAllImagesView, ProductCacheStatsView,
+                    ProductSearchView, ProductImportView)
 
 app_name = 'products'
 urlpatterns = [
     path('', ProductListCreateView.as_view(), name='product-list-create'),
     path('<int:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-retrieve-update-destroy'),
+    path('search/', ProductSearchView.as_view(), name='product-search'),
+    path('import/', ProductImportView.as_view(), name='product-import'),
+    path('cache-stats/', ProductCacheStatsView.as_view(), name='product-cache-stats'),
 
     path('img-products/<int:product_id>/images/', ProductImageListCreateView.as_view(), name='product-image-list-create'),
     path('img-products/<int:product_id>/images/<int:image_id>/', ProductImageRetrieveUpdateDestroyView.as_view(), name='product-image-retrieve-update-destroy'),
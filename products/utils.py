@@ -1,9 +1,27 @@
+import hashlib
+import os
 import requests
 from io import BytesIO
 from django.core.files import File
 
+
+def file_sha256(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
 def product_image_directory_path(inst, file_name):
-    return f"product_images/{inst.product.name}/{file_name}"
+    """
+        Content-addressed path: identical bytes always map to the same file, whatever
+        product they are uploaded for. Also records the hash on the instance; `sha256`
+        is declared after `image` so it is read after this runs on save/bulk_create.
+    """
+    inst.sha256 = file_sha256(inst.image)
+    extension = os.path.splitext(file_name)[1].lower()
+    return f"product_images/{inst.sha256[:2]}/{inst.sha256}{extension}"
 
 def multiple_image_upload(request):
     if isinstance(request.FILES.getlist("image"), list) and len(request.FILES.getlist("image")) > 1:
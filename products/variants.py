@@ -0,0 +1,118 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+# Local imports goes here!
+from .imaging import generate_variants
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """ Process pool shared by the whole process, created on first use. """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PRODUCT_IMAGE_WORKERS,
+            # Spawned workers only import products.imaging, never Django or its DB connections.
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def variant_args(image):
+    return (
+        image.image.storage.location,
+        image.image.name,
+        settings.PRODUCT_IMAGE_VARIANT_SIZES,
+        settings.PRODUCT_IMAGE_QUALITY,
+    )
+
+
+def variant_files(variants):
+    """ Every storage name listed in a `variants` map. """
+    return {name for files in variants.values() for name in files.values()}
+
+
+def store_variants(image_id, variants):
+    """
+        Save the variants of one image. When the image was replaced, the files made for its
+        previous original are deleted, unless another image still points at that original.
+        The original itself is left to image_files, which counts its references.
+    """
+    previous = ProductImage.objects.filter(pk=image_id).values_list("variants", flat=True).first() or {}
+    # update() keeps this from re-triggering post_save; bump updated_at for the image list ETag.
+    ProductImage.objects.filter(pk=image_id).update(
+        variants=variants, updated_at=timezone.now()
+    )
+
+    original = previous.get("full", {}).get("original")
+    stale = variant_files(previous) - variant_files(variants) - {original}
+    if not stale or ProductImage.objects.filter(image=original).exists():
+        return
+    storage = ProductImage._meta.get_field("image").storage
+    for name in stale:
+        storage.delete(name)
+
+
+def _on_variants_done(image_id):
+    def callback(future):
+        try:
+            store_variants(image_id, future.result())
+        except Exception as e:
+            logger.error(f"Failed to generate variants for product image {image_id}: {e}")
+        finally:
+            # Runs on the pool's management thread, which owns its own connection.
+            connections.close_all()
+    return callback
+
+
+def process_image_variants(image):
+    """ Generate and store the variants of one image in the current process. """
+    if not image.image:
+        return None
+    variants = generate_variants(*variant_args(image))
+    store_variants(image.pk, variants)
+    return variants
+
+
+def queue_image_variants(images):
+    """
+        Hand the images to the process pool once the surrounding transaction commits,
+        so the upload request never waits on Pillow.
+        With PRODUCT_IMAGE_WORKERS = 0 the variants are generated inline instead.
+    """
+    images = [image for image in images if image.image]
+    if not images:
+        return
+
+    def submit():
+        # Deduplicated uploads share their file, and so the variants already made for it.
+        existing = dict(
+            ProductImage.objects.filter(sha256__in=[image.sha256 for image in images if image.sha256])
+            .exclude(variants={})
+            .values_list("sha256", "variants")
+        )
+        for image in images:
+            shared = existing.get(image.sha256, {})
+            # A replaced image still carries the map of its previous file until this runs.
+            if shared.get("full", {}).get("original") == image.image.name:
+                store_variants(image.pk, shared)
+                continue
+            if settings.PRODUCT_IMAGE_WORKERS <= 0:
+                try:
+                    process_image_variants(image)
+                except Exception as e:
+                    logger.error(f"Failed to generate variants for product image {image.pk}: {e}")
+                continue
+            future = get_executor().submit(generate_variants, *variant_args(image))
+            future.add_done_callback(_on_variants_done(image.pk))
+
+    transaction.on_commit(submit)
@@ -1,6 +1,10 @@
+import io
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.parsers import MultiPartParser, FormParser
 import logging
 from rest_framework.permissions import (
@@ -11,17 +15,37 @@ from rest_framework.permissions import (
 # Local imports goes here!
 from .models import Product, ProductImage
 from .utils import multiple_image_upload
+from .search import search_products
+from .variants import queue_image_variants
+from .image_files import acquire_image_files
+from .importer import IMPORT_FORMATS, guess_format, import_products, read_rows
+from .conditional import (
+    product_images_validators,
+    product_list_validators,
+    product_validators,
+)
+from .cache import (
+    aget_product_data,
+    get_cache_stats,
+    get_product_list_page,
+    invalidate_product,
+    set_product_list_page,
+)
 from orders.permissions import IsOwnerOrReadOnly
+from order_processing_system.async_views import AsyncAPIView
+from order_processing_system.conditional import conditional_view
+from order_processing_system.pagination import KeysetPagination
 from .serializers import (
     ProductListCreateSerializer,
     ProductImageSerializer,
+    ProductImageUploadSerializer,
     ProductRetrieveUpdateDestroySerializer,
 )
 
 logger = logging.getLogger(__name__)
 
 
-class ProductListCreateView(APIView):
+class ProductListCreateView(AsyncAPIView):
     def get_permissions(self):
         if self.request.method == "POST":
             permission_classes = [IsAdminUser]
@@ -29,11 +53,24 @@ class ProductListCreateView(APIView):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
-    def get(self, request, *args, **kwargs):
+    @conditional_view(product_list_validators)
+    async def get(self, request, *args, **kwargs):
+        paginator = KeysetPagination()
         try:
-            products = Product.objects.all()
-            serializer = ProductListCreateSerializer(products, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            cached_page = get_product_list_page(request)
+            if cached_page is not None:
+                return Response(cached_page, status=status.HTTP_200_OK)
+
+            # Join the owner in the same query so a page costs one SELECT whatever its size.
+            products = Product.objects.select_related("user")
+            page = await paginator.apaginate_queryset(products, request, view=self)
+            serializer = ProductListCreateSerializer(page, many=True)
+            response = paginator.get_paginated_response(serializer.data)
+            set_product_list_page(request, response.data)
+            return response
+        except NotFound as e:
+            logger.warning(f'Invalid cursor while retrieving products: {request.query_params.get("cursor")}')
+            return Response({"detail": e.detail}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f'Error occurred while retrieving products: {str(e)}')
             return Response({"detail": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -62,7 +99,7 @@ class ProductListCreateView(APIView):
 
 
 
-class ProductRetrieveUpdateDestroyView(APIView):
+class ProductRetrieveUpdateDestroyView(AsyncAPIView):
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             permission_classes = [IsAdminUser]
@@ -70,11 +107,10 @@ class ProductRetrieveUpdateDestroyView(APIView):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
-    def get(self, request, pk):
+    @conditional_view(product_validators)
+    async def get(self, request, pk):
         try:
-            product = Product.objects.get(pk=pk)
-            serializer = ProductRetrieveUpdateDestroySerializer(product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(await aget_product_data(pk), status=status.HTTP_200_OK)
         except Product.DoesNotExist:
             logger.error("Product Does Not Exist.", exc_info=True)
             return Response(
@@ -166,6 +202,7 @@ class ProductImageListCreateView(APIView):
 
     """ List all images for single product based on the product id """
 
+    @conditional_view(product_images_validators)
     def get(self, request, product_id):
         try:
             product = Product.objects.get(pk=product_id)
@@ -193,30 +230,41 @@ class ProductImageListCreateView(APIView):
 
         """ Handle Multiple Images Upload """
         if multiple_image_upload(request):
-            for image_file in request.FILES.getlist("image"):
-                image_data = {"image": image_file, "product": product.id}
-                serializer = ProductImageSerializer(data=image_data)
-                if request.user == product.user:
-                    if serializer.is_valid():
-                        serializer.save(product=product)
-                        uploaded_images.append(serializer.data)
-                    else:
-                        logger.error("Error while saving image data.", exc_info=True)
-                        return Response(
-                            serializer.errors, status=status.HTTP_400_BAD_REQUEST
-                        )
-                else:
-                    logger.warning("User does not have permissions to upload image for this product.")
-                    return Response(
-                        {"detail": "You don't have permissions to upload an image for this product."},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
+            if product.user_id != request.user.id:
+                logger.warning("User does not have permissions to upload image for this product.")
+                return Response(
+                    {"detail": "You don't have permissions to upload an image for this product."},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            # Validate every file before anything is written, then insert them all at once.
+            serializer = ProductImageUploadSerializer(
+                data=[{"image": image_file} for image_file in request.FILES.getlist("image")],
+                many=True,
+            )
+            if not serializer.is_valid():
+                logger.error("Error while saving image data.", exc_info=True)
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            images = [
+                ProductImage(product=product, image=item["image"])
+                for item in serializer.validated_data
+            ]
+            with transaction.atomic():
+                # The files are streamed to storage in chunks as part of the single INSERT.
+                images = ProductImage.objects.bulk_create(images)
+                acquire_image_files(images)
+            # bulk_create() sends no post_save signals.
+            invalidate_product(product.id)
+            queue_image_variants(images)
+            uploaded_images = ProductImageSerializer(images, many=True).data
         else:
             """ Handle Single Image Upload """
             serializer = ProductImageSerializer(data=request.data)
             if request.user == product.user:
                 if serializer.is_valid():
-                    serializer.save(product=product)
+                    image = serializer.save(product=product)
+                    queue_image_variants([image])
                     uploaded_images.append(serializer.data)
                 else:
                     logger.error("Error while saving image data.", exc_info=True)
@@ -279,7 +327,8 @@ class ProductImageRetrieveUpdateDestroyView(generics.RetrieveUpdateAPIView):
             serializer = ProductImageSerializer(image, data=request.data)
 
             if serializer.is_valid() and product.user == request.user:
-                serializer.save(product=product)
+                image = serializer.save(product=product)
+                queue_image_variants([image])
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except ProductImage.DoesNotExist:
@@ -335,7 +384,10 @@ class ProductImagesDeleteAllImagesView(APIView):
 
         if request.user == product.user:
             try:
-                ProductImage.objects.filter(product=product).delete()
+                # Each deleted image drops a file reference (see signals); files still used
+                # by other products stay, and the rest are removed once this commits.
+                with transaction.atomic():
+                    ProductImage.objects.filter(product=product).delete()
                 return Response(
                     {"detail": "All Product Images deleted successfully."},
                     status=status.HTTP_204_NO_CONTENT
@@ -352,3 +404,100 @@ class ProductImagesDeleteAllImagesView(APIView):
                 {"detail": "You do not have permission to delete these images."},
                 status=status.HTTP_403_FORBIDDEN
             )
+
+
+class ProductSearchView(APIView):
+    permission_classes = [AllowAny]
+
+    """ Ranked full-text search over product names and descriptions """
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"detail": "Please provide a search query with ?q=."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            offset = 0
+        page_size = KeysetPagination().get_page_size(request)
+
+        try:
+            products = search_products(query, page_size + 1, offset)
+            next_link = None
+            if len(products) > page_size:
+                products = products[:page_size]
+                next_link = replace_query_param(
+                    request.build_absolute_uri(), "offset", offset + page_size
+                )
+            serializer = ProductListCreateSerializer(products, many=True)
+            return Response(
+                {"next": next_link, "results": serializer.data},
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            logger.error(f'Error occurred while searching products: {str(e)}')
+            return Response({"detail": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ProductImportView(APIView):
+    permission_classes = [IsAdminUser]
+    parser_classes = (
+        MultiPartParser,
+        FormParser,
+    )
+
+    """ Stream a CSV or NDJSON file of products into the catalog, owned by the requesting admin """
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"detail": "Please upload a CSV or NDJSON file as 'file'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        import_format = request.data.get("format") or guess_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            return Response(
+                {"detail": f"Unsupported format, expected one of {', '.join(IMPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        upsert = str(request.data.get("upsert", "")).lower() in ("1", "true", "yes")
+        try:
+            batch_size = max(int(request.data.get("batch_size", 1000)), 1)
+        except ValueError:
+            batch_size = 1000
+
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+            result = import_products(
+                read_rows(stream, import_format),
+                request.user,
+                batch_size=batch_size,
+                upsert=upsert,
+            )
+        except UnicodeDecodeError:
+            return Response(
+                {"detail": "The file must be UTF-8 encoded."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            logger.error(f'Error occurred while importing products: {str(e)}')
+            return Response({"detail": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(
+            f"Imported {result.rows} product rows in {result.elapsed:.2f}s: "
+            f"{result.created} created, {result.updated} updated, {len(result.errors)} failed"
+        )
+        return Response(result.as_dict(max_errors=100), status=status.HTTP_200_OK)
+
+
+class ProductCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,39 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+
+
+def get_executor():
+    """ Thread pool shared by the whole process, created on first use. """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix='password-hashing'
+        )
+    return _executor
+
+
+async def run_hashing(func, *args):
+    """
+        Run a hashing call on the hashing pool and wait for it without blocking the event
+        loop. The hashers spend their time in C code that releases the GIL, so the pool
+        adds real parallelism; its size caps how many hashes run at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+
+
+def verify_password(raw_password, encoded):
+    """
+        Check a password against its stored hash. Returns (valid, new_encoded), where
+        new_encoded is a fresh hash whenever the stored one was made with another hasher
+        or weaker parameters than the preferred hasher's, and None otherwise.
+    """
+    rehashed = []
+    valid = check_password(raw_password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return valid, (rehashed[0] if rehashed else None)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import login_view, signup_view, logout_view
+from .views import login_view, signup_view, logout_view, auth_cache_stats_view, async_login_view, async_signup_view
 
 urlpatterns = [
     path('signup/', signup_view, name='signup'),
     path('login/', login_view, name='login'),
-    path('logout/', logout_view, name='logout')
+    path('logout/', logout_view, name='logout'),
+    path('async/signup/', async_signup_view, name='async-signup'),
+    path('async/login/', async_login_view, name='async-login'),
+    path('auth-cache-stats/', auth_cache_stats_view, name='auth-cache-stats'),
 ]
\ No newline at end of file
@@ -1,15 +1,29 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError
+from django.http import JsonResponse
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAdminUser
 import logging
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 # Local imports goes here!
+from order_processing_system.throttling import LoginThrottle, SignupThrottle, throttled_response
 from .serializers import UserSerializer
+from .authentication import user_cache
+from .hashing import run_hashing, verify_password
+from .models import User
 
 logger = logging.getLogger(__name__)
 
 @api_view(["POST"])
+@throttle_classes([SignupThrottle])
 def signup_view(request):
     if request.method != "POST":
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -35,6 +49,7 @@ def signup_view(request):
 
 
 @api_view(["POST"])
+@throttle_classes([LoginThrottle])
 def login_view(request):
     if request.method != "POST":
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -52,7 +67,11 @@ def login_view(request):
         user = authenticate(email=email, password=password)
         if user is not None:
             refresh = RefreshToken.for_user(user)
-            login(request, user)
+            if settings.LOGIN_CREATES_SESSION:
+                login(request, user)
+            else:
+                # login() records last_login itself; without a session, record it here.
+                update_last_login(None, user)
             return Response(
                 {
                     "email": user.email,
@@ -73,6 +92,131 @@ def login_view(request):
         logger.error(f'Error occurred during user login: {str(e)}')
         return Response(str(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def async_signup_view(request):
+    """
+        signup_view for ASGI deployments: the password is hashed on the hashing pool
+        instead of the thread serving the request.
+    """
+    if request.method != "POST":
+        return JsonResponse({}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    throttled = await sync_to_async(throttled_response)(request, "signup")
+    if throttled is not None:
+        return throttled
+
+    try:
+        data = _json_body(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = UserSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            logger.error('Error occurred during user signup: Invalid serializer data')
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated = serializer.validated_data
+        user = User(
+            email=validated["email"],
+            first_name=validated.get("first_name", ""),
+            last_name=validated.get("last_name", ""),
+            password=await run_hashing(make_password, validated["password"]),
+        )
+        try:
+            await user.asave()
+        except IntegrityError:
+            # Another signup with this email won the race since validation.
+            return JsonResponse({"email": ["user with this email already exists."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(
+            {
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+    except Exception as e:
+        logger.error(f'Error occurred during user signup: {str(e)}')
+        return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def async_login_view(request):
+    """
+        login_view for ASGI deployments. Password checks run on the hashing pool, so a
+        burst of logins waits there rather than occupying the workers serving other
+        requests. A hash made with an outdated hasher is replaced on successful login.
+    """
+    if request.method != "POST":
+        return JsonResponse({}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    throttled = await sync_to_async(throttled_response)(request, "login")
+    if throttled is not None:
+        return throttled
+
+    try:
+        data = _json_body(request)
+        email = data.get("email") if data else None
+        password = data.get("password") if data else None
+        if email is None or password is None:
+            logger.error('Login failed: Email or password not provided')
+            return JsonResponse(
+                {"error": "Please provide both email and password"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = await User.objects.filter(email=email).afirst()
+        if user is None:
+            # Hash anyway, so response times don't reveal which emails are registered.
+            await run_hashing(make_password, password)
+            valid, new_encoded = False, None
+        else:
+            valid, new_encoded = await run_hashing(verify_password, password, user.password)
+
+        if not valid or not user.is_active:
+            logger.error('Login failed: Invalid credentials')
+            return JsonResponse(
+                {"error": "Invalid credentials"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if new_encoded:
+            user.password = new_encoded
+            await user.asave(update_fields=["password"])
+
+        refresh = await sync_to_async(RefreshToken.for_user)(user)
+        if settings.LOGIN_CREATES_SESSION:
+            await sync_to_async(login)(request, user)
+        else:
+            await sync_to_async(update_last_login)(None, user)
+        return JsonResponse(
+            {
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "access": str(refresh.access_token),
+                "refresh": str(refresh),
+            },
+            status=status.HTTP_200_OK,
+        )
+    except Exception as e:
+        logger.error(f'Error occurred during user login: {str(e)}')
+        return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# JSON API views authenticated by credentials in the body, like the DRF views above.
+async_signup_view.csrf_exempt = True
+async_login_view.csrf_exempt = True
+
+
 @api_view(["POST"])
 def logout_view(request):
     if request.method != "POST":
@@ -98,3 +242,9 @@ def logout_view(request):
     except Exception as e:
         logger.error(f'Error occurred during user logout: {str(e)}')
         return Response(str(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def auth_cache_stats_view(request):
+    return Response(user_cache.stats(), status=status.HTTP_200_OK)